@@ -1,4 +1,5 @@
 from django.contrib import admin
+from . import search
 from .models import Post, Group, Comment
 
 
@@ -13,6 +14,14 @@ class PostAdmin(admin.ModelAdmin):
     search_fields = ('text',) 
     list_filter = ('pub_date',) 
     empty_value_display = '-пусто-'
+    search_limit = 1000
+
+    def get_search_results(self, request, queryset, search_term):
+        """Search through the FTS index instead of LIKE scans."""
+        if not search_term:
+            return queryset, False
+        ids = search.matching_ids(search_term, limit=self.search_limit)
+        return queryset.filter(pk__in=ids), False
 
 class CommentAdmin(admin.ModelAdmin): 
     list_display = ('pk', 'text', 'pub_date', 'author')  
@@ -0,0 +1,101 @@
+"""Read-only JSON feeds for the mobile clients.
+
+`index`, `group` and `profile` return the same keyset pages as the HTML
+feeds, read with `.values()` so no model instances are built. Every
+page carries a strong ETag over the rows' versions (their `updated`
+stamps, comment counts and the author and group names shown) plus the
+page cursors. A client that is up to date gets 304 Not Modified before
+anything is encoded. There is no Last-Modified: deleting a post or
+renaming its group or author changes the page without changing any
+row's `updated`.
+"""
+import hashlib
+import json
+
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from django.views.decorators.http import require_safe
+
+from . import tiered
+from .models import Post
+from .paginator import CursorPaginator
+
+
+FIELDS = (
+    'pk', 'text', 'pub_date', 'updated', 'comment_count', 'image',
+    'author__username', 'group__slug',
+)
+
+
+def etag(rows, cursor):
+    digest = hashlib.sha1()
+    for row in rows:
+        digest.update(repr([row[field] for field in FIELDS]).encode())
+    digest.update(f'{cursor.next_token}|{cursor.previous_token}'.encode())
+    return quote_etag(digest.hexdigest())
+
+
+def serialize(row):
+    return {
+        'id': row['pk'],
+        'text': row['text'],
+        'author': row['author__username'],
+        'group': row['group__slug'],
+        'pub_date': row['pub_date'],
+        'updated': row['updated'],
+        'comment_count': row['comment_count'],
+        'image': default_storage.url(row['image']) if row['image'] else None,
+    }
+
+
+def link(request, name, token):
+    if token is None:
+        return None
+    return request.build_absolute_uri(f'{request.path}?{name}={token}')
+
+
+def feed(request, post_list):
+    """JSON page of `post_list`, or 304 if the client already has it."""
+    rows, cursor = CursorPaginator(
+        post_list.values(*FIELDS),
+    ).get_page(request.GET)
+    tag = etag(rows, cursor)
+    response = get_conditional_response(request, etag=tag)
+    if response is None:
+        response = HttpResponse(
+            json.dumps(
+                {
+                    'results': [serialize(row) for row in rows],
+                    'next': link(request, 'after', cursor.next_token),
+                    'previous': link(
+                        request, 'before', cursor.previous_token,
+                    ),
+                },
+                cls=DjangoJSONEncoder,
+                ensure_ascii=False,
+                separators=(',', ':'),
+            ),
+            content_type='application/json',
+        )
+    response['ETag'] = tag
+    return response
+
+
+@require_safe
+def index(request):
+    return feed(request, Post.objects.all())
+
+
+@require_safe
+def group(request, slug):
+    group = tiered.get_or_404(tiered.groups, slug)
+    return feed(request, group.posts.all())
+
+
+@require_safe
+def profile(request, username):
+    author = tiered.get_or_404(tiered.users, username)
+    return feed(request, author.posts.all())
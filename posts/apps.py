@@ -1,5 +1,12 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class PostsConfig(AppConfig):
     name = 'posts'
+
+    def ready(self):
+        from . import signals  # noqa
+        from .sqlite import apply_pragmas, check_profile
+        check_profile()
+        connection_created.connect(apply_pragmas)
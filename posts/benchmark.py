@@ -0,0 +1,313 @@
+"""Per-view latency benchmark run through the project's WSGI app.
+
+`cases()` picks representative rows from the current database (the
+busiest author, group, post and reader) and builds one request per
+route of posts/urls.py and users/urls.py: anonymous and logged in,
+first page and a deep page. `run()` times each case and counts its
+queries and response bytes; `compare()` diffs two runs.
+
+Benches run `isolated()`: the default cache is shared by every worker
+of a live install, and `--cold` clears it before each request.
+"""
+import logging
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count
+from django.test import Client, RequestFactory
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils.crypto import get_random_string
+
+from posts import tiered, timeline
+from posts.models import Comment, Follow, Group, Post, User, UserStats
+from posts.paginator import PAGE_SIZE, CursorPaginator, encode_cursor
+from posts.urls import urlpatterns as post_urls
+from users.urls import urlpatterns as user_urls
+
+
+DEEP_PAGE = 50
+BENCH_COMMENT = 'benchmark comment'
+
+
+class Case:
+    def __init__(self, name, variant, path, user=None, method='get',
+                 data=None, setup=None, headers=None):
+        self.name = name
+        self.variant = variant
+        self.path = path
+        self.user = user
+        self.method = method
+        self.data = data
+        self.setup = setup
+        self.headers = headers or {}
+
+    @property
+    def key(self):
+        return f'{self.name}:{self.variant}'
+
+
+@contextmanager
+def isolated():
+    """A scratch default cache and metrics token for one bench run."""
+    directory = tempfile.mkdtemp(prefix='yatube-bench-')
+    scratch = {
+        **settings.CACHES['default'],
+        'LOCATION': os.path.join(directory, 'cache'),
+    }
+    try:
+        with override_settings(
+            CACHES={**settings.CACHES, 'default': scratch},
+            METRICS_TOKEN=get_random_string(32),
+        ):
+            tiered.forget_all()
+            yield
+    finally:
+        tiered.forget_all()
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def route_names():
+    return {
+        pattern.name for pattern in post_urls + user_urls if pattern.name
+    }
+
+
+def deep_query(queryset, keys=('pub_date', 'pk'), page=DEEP_PAGE):
+    """`?after=` token of page `page` of `queryset`, or `?page=` if short."""
+    offset = (page - 1) * PAGE_SIZE - 1
+    rows = CursorPaginator(queryset, keys=keys).object_list.values_list(
+        *keys,
+    )[offset:offset + 1]
+    if not rows:
+        return '?page=2'
+    return '?' + urlencode({'after': encode_cursor(*rows[0], page - 1)})
+
+
+def cases():
+    """Benchmark requests for the data currently in the database."""
+    busiest = UserStats.objects.select_related('user')
+    author = busiest.order_by('-posts').first()
+    reader = busiest.order_by('-following').first()
+    if author is None or not author.posts:
+        raise ValueError('No posts to benchmark; run seed_yatube first.')
+    author, reader = author.user, reader.user
+    post = author.posts.order_by('-comment_count').first()
+    group = Group.objects.annotate(size=Count('posts')).order_by(
+        '-size',
+    ).first()
+    target = User.objects.exclude(pk__in=(author.pk, reader.pk)).filter(
+        stats__followers__lte=timeline.FANOUT_LIMIT,
+    ).first() or author
+    word = post.text.split()[0].strip('.')
+
+    def following(present):
+        # Delete row by row so the follow signals keep counters in step.
+        def setup():
+            if present:
+                Follow.objects.get_or_create(user=reader, author=target)
+                return
+            for follow in Follow.objects.filter(user=reader, author=target):
+                follow.delete()
+        return setup
+
+    post_args = (author.username, post.pk)
+    result = [
+        Case('index', 'anon', reverse('index')),
+        Case('index', 'anon-legacy', reverse('index') + '?page=5'),
+        Case('index', 'anon-deep',
+             reverse('index') + deep_query(Post.objects.all())),
+        Case('index', 'user', reverse('index'), reader),
+        Case('search', 'anon', reverse('search') + '?q=' + word),
+        Case('search', 'anon-deep',
+             reverse('search') + f'?q={word}&page={DEEP_PAGE}'),
+        Case('new_post', 'user', reverse('new_post'), author),
+        Case('follow_index', 'user', reverse('follow_index'), reader),
+        Case('follow_index', 'user-deep',
+             reverse('follow_index') + deep_query(
+                 timeline.feed(reader), timeline.FEED_KEYS,
+             ), reader),
+        Case('profile_follow', 'user',
+             reverse('profile_follow', args=[target.username]), reader,
+             setup=following(False)),
+        Case('profile_unfollow', 'user',
+             reverse('profile_unfollow', args=[target.username]), reader,
+             setup=following(True)),
+        Case('profile', 'anon', reverse('profile', args=[author.username])),
+        Case('profile', 'anon-deep',
+             reverse('profile', args=[author.username])
+             + deep_query(author.posts.all())),
+        Case('profile', 'user',
+             reverse('profile', args=[author.username]), reader),
+        Case('post', 'anon', reverse('post', args=post_args)),
+        Case('post', 'user', reverse('post', args=post_args), reader),
+        Case('post_comments', 'anon',
+             reverse('post_comments', args=post_args)),
+        Case('post_comments', 'anon-deep',
+             reverse('post_comments', args=post_args)
+             + deep_query(post.comments.all())),
+        Case('post_edit', 'user',
+             reverse('post_edit', args=post_args), author),
+        Case('add_comment', 'user',
+             reverse('add_comment', args=post_args), reader,
+             method='post', data={'text': BENCH_COMMENT}),
+        Case('404_error', 'anon', reverse('404_error')),
+        Case('500_error', 'anon', reverse('500_error')),
+        Case('signup', 'anon', reverse('signup')),
+        Case('metrics', 'scraper', reverse('metrics'), headers={
+            'HTTP_AUTHORIZATION': f'Bearer {settings.METRICS_TOKEN}',
+        }),
+        Case('api_index', 'anon', reverse('api_index')),
+        Case('api_index', 'anon-deep',
+             reverse('api_index') + deep_query(Post.objects.all())),
+        Case('api_profile', 'anon',
+             reverse('api_profile', args=[author.username])),
+    ]
+    if group is not None:
+        url = reverse('group', args=[group.slug])
+        result += [
+            Case('group', 'anon', url),
+            Case('group', 'anon-deep', url + deep_query(group.posts.all())),
+            Case('api_group', 'anon',
+                 reverse('api_group', args=[group.slug])),
+        ]
+    return result
+
+
+def percentile(values, share):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * share), len(ordered) - 1)]
+
+
+class Runner:
+    """Send `Case`s through a WSGI application like a real server."""
+
+    def __init__(self, application, cold=False):
+        self.application = application
+        self.cold = cold
+        self.factory = RequestFactory()
+        self.cookies = {}
+
+    def cookie(self, user):
+        if user is None:
+            return ''
+        if user.pk not in self.cookies:
+            client = Client()
+            client.force_login(user)
+            self.cookies[user.pk] = '; '.join(
+                f'{morsel.key}={morsel.value}'
+                for morsel in client.cookies.values()
+            )
+        return self.cookies[user.pk]
+
+    def environ(self, case):
+        cookie = self.cookie(case.user)
+        if case.method == 'post':
+            token = get_random_string(64)
+            cookie = f'{cookie}; csrftoken={token}'.lstrip('; ')
+            request = self.factory.post(
+                case.path, {**case.data, 'csrfmiddlewaretoken': token},
+            )
+        else:
+            request = self.factory.get(case.path)
+        if cookie:
+            request.environ['HTTP_COOKIE'] = cookie
+        request.environ.update(case.headers)
+        return request.environ
+
+    def request(self, case):
+        """One request: `(seconds, queries, bytes, status)`."""
+        if case.setup is not None:
+            case.setup()
+        if self.cold:
+            cache.clear()
+        environ = self.environ(case)
+        status = []
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = self.application(
+                environ, lambda code, headers, *args: status.append(code),
+            )
+            try:
+                size = sum(len(chunk) for chunk in response)
+            finally:
+                response.close()
+            elapsed = time.perf_counter() - started
+        return elapsed, len(queries), size, int(status[0].split()[0])
+
+    def measure(self, case, requests, warmup=2):
+        for _ in range(warmup):
+            self.request(case)
+        samples = [self.request(case) for _ in range(requests)]
+        timings = [sample[0] * 1000 for sample in samples]
+        return {
+            'p50': statistics.median(timings),
+            'p95': percentile(timings, 0.95),
+            'p99': percentile(timings, 0.99),
+            'queries': max(sample[1] for sample in samples),
+            'bytes': max(sample[2] for sample in samples),
+            'status': samples[-1][3],
+        }
+
+
+def run(application, requests=50, warmup=2, cold=False, only=None):
+    """`{case key: result}` for every case, in route order."""
+    runner = Runner(application, cold=cold)
+    results = {}
+    # The 404 cases would log a warning per request.
+    request_logger = logging.getLogger('django.request')
+    level = request_logger.level
+    request_logger.setLevel(logging.ERROR)
+    try:
+        with isolated():
+            for case in cases():
+                if only and case.name not in only:
+                    continue
+                results[case.key] = runner.measure(case, requests, warmup)
+    finally:
+        request_logger.setLevel(level)
+        for comment in Comment.objects.filter(text=BENCH_COMMENT):
+            comment.delete()
+    return results
+
+
+def compare(baseline, current, threshold=0.2, floor=1.0):
+    """Regressions of `current` against `baseline`, as readable lines.
+
+    Latency regresses when p50 or p95 grows by more than `threshold`
+    and at least `floor` ms; queries regress on any increase, bytes by
+    more than `threshold`, and a changed status always counts.
+    """
+    problems = []
+    for key, now in current.items():
+        before = baseline.get(key)
+        if before is None:
+            continue
+        for metric in ('p50', 'p95'):
+            grown = now[metric] - before[metric]
+            if grown > floor and grown > before[metric] * threshold:
+                problems.append(
+                    f'{key}: {metric} {before[metric]:.2f} -> '
+                    f'{now[metric]:.2f} ms'
+                )
+        if now['queries'] > before['queries']:
+            problems.append(
+                f"{key}: queries {before['queries']} -> {now['queries']}"
+            )
+        if now['bytes'] > before['bytes'] * (1 + threshold):
+            problems.append(
+                f"{key}: bytes {before['bytes']} -> {now['bytes']}"
+            )
+        if now['status'] != before['status']:
+            problems.append(
+                f"{key}: status {before['status']} -> {now['status']}"
+            )
+    return problems
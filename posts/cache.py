@@ -0,0 +1,305 @@
+"""Page caches invalidated by content events rather than by expiry.
+
+Each cached page family has a generation counter; the counter is part
+of the cache key, so bumping it on a model signal makes every worker
+miss the old entries at once while they age out on their own.
+
+Public pages are cached per URL for anonymous visitors and tagged with
+surrogate keys naming the objects they show (`post:1`, `group:2`...).
+`purge()` stamps a tag with the current time, and a cached page is
+only served while every one of its tags was last purged before the
+page started rendering, so a page built from rows read just before a
+purge is never kept.
+
+Misses are single-flight: one request takes a short lock and rebuilds
+the page while concurrent requests for the same URL are served the last
+copy built under any generation. With `CACHE_EARLY_REFRESH` above zero
+a fresh entry is also rebuilt early, with a probability that rises as
+it nears expiry (the XFetch rule), so hot pages rarely expire at all.
+"""
+import hashlib
+import math
+import random
+import time
+from functools import lru_cache, wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.middleware.cache import CacheMiddleware
+from django.utils.cache import get_cache_key, learn_cache_key
+from django.utils.decorators import decorator_from_middleware_with_args
+from django.views.decorators.vary import vary_on_cookie
+
+from . import metrics
+
+
+LOCK_TIMEOUT = getattr(settings, 'CACHE_LOCK_TIMEOUT', 30)
+EARLY_REFRESH = getattr(settings, 'CACHE_EARLY_REFRESH', 0)
+
+
+def _generation_key(name):
+    return f'generation:{name}'
+
+
+def generation(name):
+    value = cache.get(_generation_key(name))
+    if value is None:
+        # Start from the clock so a lost counter never reuses old keys.
+        cache.add(_generation_key(name), int(time.time() * 1000000), None)
+        value = cache.get(_generation_key(name))
+    return value
+
+
+def generations(*names):
+    """`generation()` of each of `names`, read in one cache round trip."""
+    found = cache.get_many([_generation_key(name) for name in names])
+    return [
+        found.get(_generation_key(name)) or generation(name)
+        for name in names
+    ]
+
+
+def bump(name):
+    try:
+        cache.incr(_generation_key(name))
+    except ValueError:
+        generation(name)
+
+
+def lock(key, backend=cache):
+    """Take the rebuild lock of `key`; False if another request has it."""
+    return backend.add(f'lock:{key}', 1, LOCK_TIMEOUT)
+
+
+def unlock(key, backend=cache):
+    backend.delete(f'lock:{key}')
+
+
+def refresh_early(expires, cost, now=None):
+    """XFetch: rebuild before `expires`, sooner for costlier entries."""
+    if not EARLY_REFRESH or not cost:
+        return False
+    now = time.time() if now is None else now
+    gap = -cost * EARLY_REFRESH * math.log(1 - random.random())
+    return now + gap >= expires
+
+
+def get_or_build(key, timeout, build, backend=cache):
+    """`(value, result)` of the entry at `key`, rebuilt single-flight.
+
+    Entries are kept for twice their `timeout`. Past `timeout` one
+    caller rebuilds while the others are handed the stale value;
+    `result` is 'hit', 'stale' or 'miss'.
+    """
+    entry = backend.get(key)
+    if entry is None:
+        # Nothing to serve meanwhile: the lock only spares the others.
+        locked = lock(key, backend)
+    else:
+        value, expires, cost = entry
+        now = time.time()
+        if now < expires and not refresh_early(expires, cost, now):
+            return value, 'hit'
+        if not lock(key, backend):
+            return value, 'hit' if now < expires else 'stale'
+        locked = True
+    started = time.perf_counter()
+    try:
+        value = build()
+    finally:
+        if locked:
+            unlock(key, backend)
+    cost = time.perf_counter() - started
+    if timeout is None:
+        backend.set(key, (value, math.inf, cost), None)
+    else:
+        backend.set(key, (value, time.time() + timeout, cost), 2 * timeout)
+    return value, 'miss'
+
+
+class SingleFlightCacheMiddleware(CacheMiddleware):
+    """`cache_page` middleware that rebuilds each URL one request at a time.
+
+    `stale_prefix` names the family across generations: each rebuilt
+    page is also kept under it for `2 * cache_timeout`, keyed on the
+    headers it varies on, to be served while another request rebuilds
+    that URL after a miss. Pages of logged-in users are never kept.
+    """
+
+    def __init__(self, get_response=None, cache_timeout=None,
+                 stale_prefix='', **kwargs):
+        super().__init__(get_response, cache_timeout, **kwargs)
+        self.stale_prefix = stale_prefix
+
+    def _url_key(self, request):
+        url = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+        return f'page:{self.stale_prefix}:{url}'
+
+    def _stale_prefix(self):
+        return f'stale.{self.stale_prefix}'
+
+    def _keeps_stale(self, request, response):
+        """Like the page itself: shared copies of shared responses only."""
+        user = getattr(request, 'user', None)
+        return (
+            request.method == 'GET'
+            and not (user and user.is_authenticated)
+            and response.status_code == 200
+            and not response.streaming
+            and not response.cookies
+            and 'private' not in response.get('Cache-Control', '')
+        )
+
+    def process_request(self, request):
+        request._cache_started = time.perf_counter()
+        response = super().process_request(request)
+        if request.method not in ('GET', 'HEAD'):
+            return response
+        if response is not None:
+            request._cache_result = 'hit'
+            expires, cost = getattr(response, '_cache_xfetch', (0, 0))
+            if not refresh_early(expires, cost):
+                return response
+            if not lock(self._url_key(request), self.cache):
+                return response
+            # Rebuild early; everyone else keeps getting this copy.
+            request._cache_locked = True
+            request._cache_update_cache = True
+            return None
+        request._cache_result = 'miss'
+        if lock(self._url_key(request), self.cache):
+            request._cache_locked = True
+            return None
+        # Keyed like the page, on the URL and the headers it varies on.
+        key = get_cache_key(
+            request, self._stale_prefix(), 'GET', cache=self.cache,
+        )
+        stale = None if key is None else self.cache.get(key)
+        if stale is None:
+            return None
+        request._cache_result = 'stale'
+        request._cache_update_cache = False
+        return stale
+
+    def process_response(self, request, response):
+        if getattr(request, '_cache_update_cache', False):
+            response._cache_xfetch = (
+                time.time() + self.cache_timeout,
+                time.perf_counter() - request._cache_started,
+            )
+        response = super().process_response(request, response)
+        if getattr(request, '_cache_locked', False):
+            if self._keeps_stale(request, response):
+                key = learn_cache_key(
+                    request, response, 2 * self.cache_timeout,
+                    self._stale_prefix(), cache=self.cache,
+                )
+                self.cache.set(key, response, 2 * self.cache_timeout)
+            unlock(self._url_key(request), self.cache)
+        return response
+
+    def process_exception(self, request, exception):
+        if getattr(request, '_cache_locked', False):
+            unlock(self._url_key(request), self.cache)
+
+
+@lru_cache(maxsize=32)
+def _cached_view(view, timeout, key_prefix, stale_prefix):
+    # Vary on the cookie before the middleware learns the key: the
+    # session middleware only adds it outside, after the page is stored.
+    return decorator_from_middleware_with_args(SingleFlightCacheMiddleware)(
+        page_timeout=timeout,
+        key_prefix=key_prefix,
+        stale_prefix=stale_prefix,
+    )(vary_on_cookie(view))
+
+
+def cache_page_by_generation(timeout, key_prefix):
+    """`cache_page` whose entries are dropped by `bump(key_prefix)`."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            prefix = f'{key_prefix}.{generation(key_prefix)}'
+            cached = _cached_view(view, timeout, prefix, key_prefix)
+            response = cached(request, *args, **kwargs)
+            if hasattr(request, '_cache_result'):
+                metrics.cache_lookup('page', request._cache_result)
+            return response
+        return wrapper
+    return decorator
+
+
+def _tag_key(tag):
+    return f'purged:{tag}'
+
+
+def purge(*tags):
+    """Drop every public page tagged with one of `tags`."""
+    def stamp():
+        now = time.time()
+        cache.set_many({_tag_key(tag): now for tag in tags}, None)
+    stamp()
+    # Again on commit: a page rendered before then saw the old rows.
+    transaction.on_commit(stamp)
+
+
+def tag_response(response, *tags):
+    """Add `tags` to the response's `Surrogate-Key` header."""
+    current = response.get('Surrogate-Key', '').split()
+    response['Surrogate-Key'] = ' '.join(dict.fromkeys([*current, *tags]))
+    return response
+
+
+def _fresh(tags, started):
+    keys = [_tag_key(tag) for tag in tags]
+    purged = cache.get_many(keys)
+    for key in keys:
+        if key not in purged:
+            # Lost stamp: an unknown purge may have happened.
+            cache.add(key, time.time(), None)
+            return False
+    return all(stamp < started for stamp in purged.values())
+
+
+def _cacheable(response):
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        and response.has_header('Surrogate-Key')
+    )
+
+
+def cache_public_page(timeout):
+    """Cache anonymous GET responses until a surrogate key is purged.
+
+    The view names what it shows with `tag_response()`; untagged
+    responses, and responses setting cookies, are not cached.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if (request.method not in ('GET', 'HEAD')
+                    or request.user.is_authenticated):
+                return view(request, *args, **kwargs)
+            key = 'public:' + hashlib.md5(
+                request.build_absolute_uri().encode()
+            ).hexdigest()
+            entry = cache.get(key)
+            if entry is not None:
+                response, started, tags = entry
+                if _fresh(tags, started):
+                    metrics.cache_lookup('public', 'hit')
+                    return response
+            metrics.cache_lookup('public', 'miss')
+            started = time.time()
+            response = view(request, *args, **kwargs)
+            if _cacheable(response):
+                tags = response['Surrogate-Key'].split()
+                # Seeds lost stamps, so a later request may keep the page.
+                _fresh(tags, started)
+                cache.set(key, (response, started, tags), timeout)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,283 @@
+"""Cache backend shared by every worker process on a host.
+
+`SQLiteCache` keeps entries in one SQLite file in WAL mode, so all
+gunicorn workers see the same page cache and the same generation
+counters, and a `bump()` in one worker invalidates the others. Reads
+never block writes. Entries are evicted least recently used first once
+the cache holds more than `MAX_ENTRIES` entries or `MAX_BYTES` of
+values (checked every `CULL_EVERY` writes); the access time is
+refreshed at most every `ACCESS_RESOLUTION` seconds so hot reads do not
+turn into writes. Values are pickles, so the file is created readable
+by its owner only, and a file somebody else created is refused.
+
+    CACHES = {'default': {
+        'BACKEND': 'posts.cache_backend.SQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'var', 'cache.sqlite3'),
+        'OPTIONS': {'MAX_ENTRIES': 20000, 'MAX_BYTES': 256 * 2 ** 20},
+    }}
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.exceptions import ImproperlyConfigured
+
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache ('
+    ' key TEXT PRIMARY KEY,'
+    ' value BLOB NOT NULL,'
+    ' expires REAL,'
+    ' accessed REAL NOT NULL'
+    ') WITHOUT ROWID',
+    'CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)',
+)
+# SQLite's default limit on host parameters in one statement.
+MAX_PARAMS = 999
+
+
+def create_private(path):
+    """Create `path` for its owner only, or check an existing file is."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+    fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_NOFOLLOW, 0o600)
+    try:
+        info = os.fstat(fd)
+        if info.st_uid != os.geteuid():
+            raise ImproperlyConfigured(
+                f'Cache file {path} belongs to another user.'
+            )
+        if info.st_mode & 0o077:
+            os.fchmod(fd, 0o600)
+    finally:
+        os.close(fd)
+
+
+class SQLiteCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = location
+        self._max_bytes = int(options.get('MAX_BYTES', 64 * 2 ** 20))
+        self._access_resolution = float(
+            options.get('ACCESS_RESOLUTION', 10),
+        )
+        # How many writes may pass between two size checks.
+        self._cull_every = int(options.get('CULL_EVERY', 100))
+        self._local = threading.local()
+        self._writes = 0
+
+    @property
+    def _db(self):
+        """This thread's connection; reopened after a fork."""
+        db = getattr(self._local, 'db', None)
+        if db is None or self._local.pid != os.getpid():
+            # SQLite gives the -wal and -shm files the same mode.
+            create_private(self._path)
+            db = sqlite3.connect(
+                self._path, timeout=5, isolation_level=None,
+                check_same_thread=False,
+            )
+            db.execute('PRAGMA journal_mode = wal')
+            # Losing the last writes of a crash only costs cache misses.
+            db.execute('PRAGMA synchronous = off')
+            for statement in SCHEMA:
+                db.execute(statement)
+            self._local.db, self._local.pid = db, os.getpid()
+        return db
+
+    @contextmanager
+    def _transaction(self):
+        db = self._db
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            yield db
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+
+    def _expired(self, expires, now):
+        return expires is not None and expires <= now
+
+    def _touch_stale(self, rows, now):
+        stale = [
+            key for key, accessed in rows
+            if now - accessed >= self._access_resolution
+        ]
+        for start in range(0, len(stale), MAX_PARAMS - 1):
+            chunk = stale[start:start + MAX_PARAMS - 1]
+            self._db.execute(
+                'UPDATE cache SET accessed = ? WHERE key IN ({})'.format(
+                    ', '.join('?' * len(chunk))
+                ),
+                [now, *chunk],
+            )
+
+    def _read(self, keys):
+        now = time.time()
+        found, seen = {}, []
+        for start in range(0, len(keys), MAX_PARAMS):
+            chunk = keys[start:start + MAX_PARAMS]
+            rows = self._db.execute(
+                'SELECT key, value, expires, accessed FROM cache '
+                'WHERE key IN ({})'.format(', '.join('?' * len(chunk))),
+                chunk,
+            )
+            for key, value, expires, accessed in rows:
+                if not self._expired(expires, now):
+                    found[key] = pickle.loads(value)
+                    seen.append((key, accessed))
+        self._touch_stale(seen, now)
+        return found
+
+    def _write(self, items, timeout):
+        now = time.time()
+        expires = self.get_backend_timeout(timeout)
+        rows = [
+            (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), expires, now)
+            for key, value in items
+        ]
+        with self._transaction() as db:
+            db.executemany(
+                'INSERT INTO cache (key, value, expires, accessed) '
+                'VALUES (?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET '
+                'value = excluded.value, expires = excluded.expires, '
+                'accessed = excluded.accessed',
+                rows,
+            )
+        self._writes += len(items)
+        if self._writes >= self._cull_every:
+            self._writes = 0
+            self._cull()
+
+    def _cull(self):
+        """Drop expired entries, then least recently used ones over a cap."""
+        db = self._db
+        db.execute('DELETE FROM cache WHERE expires <= ?', [time.time()])
+        if self._cull_frequency == 0:
+            # Django's convention: CULL_FREQUENCY 0 empties the cache.
+            if db.execute('SELECT count(*) FROM cache').fetchone()[0] > (
+                self._max_entries
+            ):
+                db.execute('DELETE FROM cache')
+            return
+        while True:
+            count, size = db.execute(
+                'SELECT count(*), total(length(value)) FROM cache'
+            ).fetchone()
+            if count <= self._max_entries and size <= self._max_bytes:
+                return
+            # Trim a slice at a time, like Django's CULL_FREQUENCY.
+            db.execute(
+                'DELETE FROM cache WHERE key IN ('
+                ' SELECT key FROM cache ORDER BY accessed LIMIT ?'
+                ')',
+                [max(count // self._cull_frequency, 1)],
+            )
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        now = time.time()
+        with self._transaction() as db:
+            db.execute(
+                'DELETE FROM cache WHERE key = ? AND expires <= ?',
+                [key, now],
+            )
+            return db.execute(
+                'INSERT OR IGNORE INTO cache (key, value, expires, accessed) '
+                'VALUES (?, ?, ?, ?)',
+                [key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+                 self.get_backend_timeout(timeout), now],
+            ).rowcount == 1
+
+    def get(self, key, default=None, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return self._read([key]).get(key, default)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        self._write([(key, value)], timeout)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return self._db.execute(
+            'UPDATE cache SET expires = ? WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            [self.get_backend_timeout(timeout), key, time.time()],
+        ).rowcount == 1
+
+    def delete(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        self._db.execute('DELETE FROM cache WHERE key = ?', [key])
+
+    def has_key(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return self._db.execute(
+            'SELECT 1 FROM cache WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            [key, time.time()],
+        ).fetchone() is not None
+
+    def incr(self, key, delta=1, version=None):
+        """Atomic across processes, unlike BaseCache.incr()."""
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        with self._transaction() as db:
+            row = db.execute(
+                'SELECT value, expires FROM cache WHERE key = ?', [key],
+            ).fetchone()
+            if row is None or self._expired(row[1], time.time()):
+                raise ValueError("Key '%s' not found" % key)
+            value = pickle.loads(row[0]) + delta
+            db.execute(
+                'UPDATE cache SET value = ? WHERE key = ?',
+                [pickle.dumps(value, pickle.HIGHEST_PROTOCOL), key],
+            )
+        return value
+
+    def get_many(self, keys, version=None):
+        made = {self.make_key(key, version=version): key for key in keys}
+        for key in made:
+            self.validate_key(key)
+        found = self._read(list(made))
+        return {made[key]: value for key, value in found.items()}
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        items = []
+        for key, value in data.items():
+            key = self.make_key(key, version=version)
+            self.validate_key(key)
+            items.append((key, value))
+        if items:
+            self._write(items, timeout)
+        return []
+
+    def delete_many(self, keys, version=None):
+        keys = [self.make_key(key, version=version) for key in keys]
+        for start in range(0, len(keys), MAX_PARAMS):
+            chunk = keys[start:start + MAX_PARAMS]
+            self._db.execute(
+                'DELETE FROM cache WHERE key IN ({})'.format(
+                    ', '.join('?' * len(chunk))
+                ),
+                chunk,
+            )
+
+    def clear(self):
+        self._db.execute('DELETE FROM cache')
+
+    def close(self, **kwargs):
+        # Connections are per thread and reused across requests.
+        pass
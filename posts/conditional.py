@@ -0,0 +1,119 @@
+"""Conditional GET for the group, profile and post pages.
+
+Each page's ETag is built from generation counters (see posts/cache.py)
+named after its URL: the group slug, the author's username, the post
+id. Checking it reads those counters in one cache round trip and no
+database query, so an unchanged page is answered with 304 before the
+view runs. The viewer's id and CSRF secret are part of the tag because
+the pages show per-viewer buttons and forms.
+
+Content signals bump the counters of every page showing the changed
+rows; a post, for instance, appears on its own page, its author's
+profile and its group. The lookups that needs are paid on writes,
+which are rare next to reads. Group titles show on every card, so any
+group change bumps the shared `groups` counter.
+"""
+import hashlib
+
+from django.db import transaction
+from django.middleware.csrf import get_token
+
+from . import cache
+from .models import Comment, Post, User
+
+
+GROUPS = 'groups'
+
+
+def group_key(slug):
+    return f'group:{slug}'
+
+
+def profile_key(username):
+    return f'profile:{username}'
+
+
+def post_key(post_id):
+    return f'post:{post_id}'
+
+
+def etag(request, *names):
+    viewer = None
+    if request.user.is_authenticated:
+        # Their forms carry the CSRF secret, which a login rotates.
+        # get_token() makes sure the response sets the cookie it is in.
+        get_token(request)
+        viewer = (request.user.pk, request.META['CSRF_COOKIE'])
+    versions = cache.generations(GROUPS, *names)
+    return hashlib.sha1(repr((viewer, versions)).encode()).hexdigest()
+
+
+def group_etag(request, slug):
+    return etag(request, group_key(slug))
+
+
+def profile_etag(request, username):
+    return etag(request, profile_key(username))
+
+
+def post_etag(request, username, post_id):
+    # The sidebar shows the author's counters, kept on the profile key.
+    return etag(request, profile_key(username), post_key(post_id))
+
+
+def bump(*names):
+    def bump_all():
+        for name in names:
+            cache.bump(name)
+    bump_all()
+    # Again on commit: a tag computed before then described old rows.
+    transaction.on_commit(bump_all)
+
+
+def post_changed(post, previous_group=None):
+    names = [post_key(post.pk), profile_key(post.author.username)]
+    for slug in {post.group.slug if post.group_id else None, previous_group}:
+        if slug is not None:
+            names.append(group_key(slug))
+    bump(*names)
+
+
+def comment_changed(comment):
+    owner = Post.objects.filter(pk=comment.post_id).values_list(
+        'author__username', 'group__slug',
+    ).first()
+    names = [post_key(comment.post_id)]
+    if owner is not None:
+        username, slug = owner
+        names.append(profile_key(username))
+        if slug is not None:
+            names.append(group_key(slug))
+    bump(*names)
+
+
+def user_changed(user, previous_username=None):
+    """Bump the pages showing `user`'s name; True if they have posts."""
+    slugs = set(
+        Post.objects.filter(author_id=user.pk).values_list(
+            'group__slug', flat=True,
+        ).distinct()
+    )
+    names = {profile_key(user.username)}
+    if previous_username is not None:
+        names.add(profile_key(previous_username))
+    names.update(group_key(slug) for slug in slugs if slug is not None)
+    # Their comments show on other authors' posts.
+    names.update(
+        post_key(post_id) for post_id in Comment.objects.filter(
+            author_id=user.pk,
+        ).values_list('post_id', flat=True).distinct()
+    )
+    bump(*names)
+    return bool(slugs)
+
+
+def follow_changed(follow):
+    usernames = User.objects.filter(
+        pk__in=(follow.user_id, follow.author_id),
+    ).values_list('username', flat=True)
+    bump(*(profile_key(username) for username in usernames))
@@ -0,0 +1,12 @@
+from django.utils.functional import SimpleLazyObject
+
+from . import followed
+
+
+def followed_authors(request):
+    """`followed_ids` for follow buttons, loaded only if a template asks."""
+    return {
+        'followed_ids': SimpleLazyObject(
+            lambda: followed.author_ids(request.user),
+        ),
+    }
@@ -0,0 +1,48 @@
+"""Recount the denormalized counters from the source tables."""
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Post, User, UserStats
+
+
+def _count_of(model, field):
+    rows = model.objects.filter(**{field: OuterRef('pk')}).order_by()
+    return Coalesce(
+        Subquery(
+            rows.values(field).annotate(total=Count('pk')).values('total')
+        ),
+        0,
+    )
+
+
+def _repair(queryset, field, expected):
+    """Rewrite `field` where it disagrees with `expected`; return rows fixed."""
+    drifted = queryset.annotate(expected=expected).exclude(
+        **{field: F('expected')}
+    )
+    pks = list(drifted.values_list('pk', flat=True))
+    if pks:
+        queryset.filter(pk__in=pks).update(**{field: expected})
+    return len(pks)
+
+
+def recount():
+    """Repair every counter; return `{counter: rows fixed}`."""
+    UserStats.objects.bulk_create(
+        (UserStats(user_id=pk) for pk in
+         User.objects.filter(stats=None).values_list('pk', flat=True)),
+        batch_size=500,
+    )
+    stats = UserStats.objects.all()
+    return {
+        'post.comment_count': _repair(
+            Post.objects.all(), 'comment_count', _count_of(Comment, 'post'),
+        ),
+        'stats.posts': _repair(stats, 'posts', _count_of(Post, 'author')),
+        'stats.followers': _repair(
+            stats, 'followers', _count_of(Follow, 'author'),
+        ),
+        'stats.following': _repair(
+            stats, 'following', _count_of(Follow, 'user'),
+        ),
+    }
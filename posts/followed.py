@@ -0,0 +1,42 @@
+"""Cached set of the authors each user follows.
+
+"Does the viewer follow X" comes up on every profile page and for any
+follow button next to an author, so each user's followed author ids are
+read once into the cache and answered from there without a query per
+author. Follow signals drop the set and it is reloaded with one indexed
+query on the next read; patching it in place could keep a follow that
+was rolled back.
+"""
+from django.core.cache import cache
+
+from .models import Follow
+
+
+TIMEOUT = 60 * 60 * 24
+
+
+def _key(user_id):
+    return f'followed:{user_id}'
+
+
+def author_ids(user):
+    """Frozenset of the ids of the authors `user` follows."""
+    if not user.is_authenticated:
+        return frozenset()
+    ids = cache.get(_key(user.pk))
+    if ids is None:
+        ids = frozenset(
+            Follow.objects.filter(user_id=user.pk).values_list(
+                'author_id', flat=True,
+            )
+        )
+        cache.set(_key(user.pk), ids, TIMEOUT)
+    return ids
+
+
+def is_following(user, author):
+    return author.pk in author_ids(user)
+
+
+def forget(user_id):
+    cache.delete(_key(user_id))
@@ -0,0 +1,115 @@
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+
+
+BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'sqlite': 'posts.cache_backend.SQLiteCache',
+}
+
+
+def make_cache(name, directory):
+    location = {
+        'locmem': f'bench-{os.getpid()}',
+        'file': os.path.join(directory, 'file'),
+        'sqlite': os.path.join(directory, 'cache.sqlite3'),
+    }[name]
+    return import_string(BACKENDS[name])(
+        location, {'OPTIONS': {'MAX_ENTRIES': 100000}, 'TIMEOUT': None},
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare LocMemCache, FileBasedCache and the shared SQLite cache: '
+        'single-process get/set throughput, then page-cache hit rate and '
+        'throughput with several worker processes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--keys', type=int, default=500)
+        parser.add_argument('--requests', type=int, default=5000,
+                            help='Requests per worker.')
+        parser.add_argument('--value-size', type=int, default=15000,
+                            help='Bytes per entry, about a rendered page.')
+
+    def single(self, cache, value, keys):
+        started = time.perf_counter()
+        for key in keys:
+            cache.set(key, value)
+        set_rate = len(keys) / (time.perf_counter() - started)
+        started = time.perf_counter()
+        for key in keys:
+            cache.get(key)
+        return set_rate, len(keys) / (time.perf_counter() - started)
+
+    def worker(self, name, directory, options, seed, results):
+        cache = make_cache(name, directory)
+        rng = random.Random(seed)
+        value = b'x' * options['value_size']
+        # A few hot pages and a long tail, like feed and profile pages.
+        weights = [1 / rank for rank in range(1, options['keys'] + 1)]
+        keys = rng.choices(
+            range(options['keys']), weights=weights, k=options['requests'],
+        )
+        hits = 0
+        started = time.perf_counter()
+        for key in keys:
+            if cache.get(f'page:{key}') is None:
+                cache.set(f'page:{key}', value)
+            else:
+                hits += 1
+        results.put((hits, time.perf_counter() - started))
+
+    def shared(self, name, directory, options):
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        processes = [
+            context.Process(
+                target=self.worker,
+                args=(name, directory, options, seed, results),
+            )
+            for seed in range(options['workers'])
+        ]
+        for process in processes:
+            process.start()
+        outcomes = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+        total = options['requests'] * options['workers']
+        hits = sum(hits for hits, _ in outcomes)
+        slowest = max(seconds for _, seconds in outcomes)
+        return hits / total, total / slowest
+
+    def handle(self, *args, **options):
+        value = b'x' * options['value_size']
+        keys = [f'key:{number}' for number in range(options['keys'])]
+        self.stdout.write(
+            f"{'backend':8} {'set/s':>9} {'get/s':>9}   "
+            f"{options['workers']} workers: {'hit rate':>8} {'req/s':>9}"
+        )
+        for name in BACKENDS:
+            directory = tempfile.mkdtemp()
+            try:
+                set_rate, get_rate = self.single(
+                    make_cache(name, directory), value, keys,
+                )
+                hit_rate, request_rate = self.shared(
+                    name, tempfile.mkdtemp(dir=directory), options,
+                )
+            finally:
+                shutil.rmtree(directory, ignore_errors=True)
+            self.stdout.write(
+                f'{name:8} {set_rate:9.0f} {get_rate:9.0f}   '
+                f"{'':{len(str(options['workers'])) + 9}}"
+                f'{hit_rate:8.1%} {request_rate:9.0f}'
+            )
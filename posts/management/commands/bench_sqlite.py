@@ -0,0 +1,132 @@
+import multiprocessing
+import queue
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections
+from django.test.utils import override_settings
+
+from posts.models import Comment, Post, User
+from posts.sqlite import PROFILES
+
+
+# How long past the run the parent waits for a child's report.
+GRACE_SECONDS = 30
+
+
+def percentile(values, share):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * share), len(ordered) - 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Hammer the SQLite database with concurrent feed readers and '
+        'comment writers, each in its own process like a web worker, and '
+        'report throughput, latency and lock errors.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profile', choices=sorted(PROFILES),
+                            default='production')
+        parser.add_argument('--readers', type=int, default=16)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--seconds', type=float, default=10.0)
+
+    def read(self):
+        list(Post.objects.for_feed()[:11])
+
+    def write(self):
+        Comment.objects.create(
+            post_id=self.post_id, author_id=self.user_id, text='bench',
+        )
+
+    def worker(self, action, deadline, results):
+        timings, errors, failure = [], 0, None
+        try:
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                try:
+                    action()
+                except OperationalError:
+                    errors += 1
+                    continue
+                timings.append(time.perf_counter() - started)
+        except Exception as exc:
+            failure = f'{type(exc).__name__}: {exc}'
+        finally:
+            connections.close_all()
+            # Always report, or the parent would wait forever.
+            results.put((timings, errors, failure))
+
+    def run_group(self, context, action, count, deadline):
+        results = context.Queue()
+        processes = [
+            context.Process(target=self.worker,
+                            args=(action, deadline, results))
+            for _ in range(count)
+        ]
+        return processes, results
+
+    def collect(self, results, processes, timeout):
+        try:
+            reports = [results.get(timeout=timeout) for _ in processes]
+        except queue.Empty:
+            raise CommandError('A benchmark process died without reporting.')
+        for _, _, failure in reports:
+            if failure is not None:
+                raise CommandError(f'A benchmark process failed: {failure}')
+        return [(timings, errors) for timings, errors, _ in reports]
+
+    def report(self, name, results, seconds):
+        timings = [value for chunk, _ in results for value in chunk]
+        errors = sum(errors for _, errors in results)
+        self.stdout.write(
+            f'{name:8} {len(timings) / seconds:9.1f} ops/s  '
+            f'p50 {statistics.median(timings or [0]) * 1000:7.2f} ms  '
+            f'p95 {percentile(timings, 0.95) * 1000:7.2f} ms  '
+            f'p99 {percentile(timings, 0.99) * 1000:7.2f} ms  '
+            f'locked {errors}'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('bench_sqlite needs SQLite.')
+        post = Post.objects.first()
+        if post is None:
+            raise CommandError('No posts to read; run seed data first.')
+        self.post_id, self.user_id = post.pk, User.objects.first().pk
+        profile = options['profile']
+        pragmas = PROFILES[profile] or {'journal_mode': 'delete'}
+        # Children are forked and must not share the parent's connection.
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        with override_settings(SQLITE_PROFILE=profile, SQLITE_PRAGMAS=pragmas):
+            deadline = time.monotonic() + options['seconds'] + 1
+            readers, read_queue = self.run_group(
+                context, self.read, options['readers'], deadline)
+            writers, write_queue = self.run_group(
+                context, self.write, options['writers'], deadline)
+            timeout = options['seconds'] + 1 + GRACE_SECONDS
+            try:
+                for process in readers + writers:
+                    process.start()
+                read_results = self.collect(read_queue, readers, timeout)
+                write_results = self.collect(write_queue, writers, timeout)
+            finally:
+                for process in readers + writers:
+                    if process.is_alive():
+                        process.terminate()
+                    process.join()
+                Comment.objects.filter(
+                    text='bench', post_id=self.post_id,
+                ).delete()
+        self.stdout.write(
+            f"Profile {profile}: {options['readers']} readers, "
+            f"{options['writers']} writers, {options['seconds']} s"
+        )
+        self.report('readers', read_results, options['seconds'])
+        self.report('writers', write_results, options['seconds'])
@@ -0,0 +1,83 @@
+import json
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+
+from posts import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Time every posts/users route through the WSGI app against the '
+        'current database, reporting latency percentiles, queries and '
+        'bytes; save a JSON baseline or compare against one.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Clear the cache before every request.',
+        )
+        parser.add_argument(
+            '--only', nargs='+', metavar='URL_NAME',
+            help='Benchmark just these routes.',
+        )
+        parser.add_argument('--save', metavar='PATH',
+                            help='Write the results as a JSON baseline.')
+        parser.add_argument('--compare', metavar='PATH',
+                            help='Fail on regressions against a baseline.')
+        parser.add_argument(
+            '--threshold', type=float, default=0.2,
+            help='Relative growth that counts as a regression.',
+        )
+
+    def handle(self, *args, **options):
+        # Not yatube.wsgi: this process is no server, see posts/metrics.py.
+        application = get_wsgi_application()
+        missing = benchmark.route_names() - {
+            case.name for case in benchmark.cases()
+        }
+        if missing:
+            raise CommandError(
+                'No benchmark case for: ' + ', '.join(sorted(missing))
+            )
+        results = benchmark.run(
+            application,
+            requests=options['requests'],
+            warmup=options['warmup'],
+            cold=options['cold'],
+            only=options['only'],
+        )
+        self.stdout.write(
+            f"{'case':32} {'p50':>8} {'p95':>8} {'p99':>8} "
+            f"{'queries':>7} {'bytes':>8} status"
+        )
+        for key, result in results.items():
+            self.stdout.write(
+                f"{key:32} {result['p50']:8.2f} {result['p95']:8.2f} "
+                f"{result['p99']:8.2f} {result['queries']:7} "
+                f"{result['bytes']:8} {result['status']}"
+            )
+        if options['save']:
+            with open(options['save'], 'w') as baseline:
+                json.dump({
+                    'created': datetime.now(timezone.utc).isoformat(),
+                    'requests': options['requests'],
+                    'cold': options['cold'],
+                    'results': results,
+                }, baseline, indent=2, sort_keys=True)
+            self.stdout.write(f"Baseline saved to {options['save']}")
+        if options['compare']:
+            with open(options['compare']) as baseline:
+                stored = json.load(baseline)['results']
+            problems = benchmark.compare(
+                stored, results, threshold=options['threshold'],
+            )
+            if problems:
+                for problem in problems:
+                    self.stderr.write(problem)
+                raise CommandError(f'{len(problems)} regression(s)')
+            self.stdout.write(self.style.SUCCESS('No regressions'))
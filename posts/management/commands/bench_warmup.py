@@ -0,0 +1,114 @@
+import logging
+import multiprocessing
+import os
+import queue
+import statistics
+import traceback
+
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+
+# Seconds the parent waits for a worker's report.
+TIMEOUT = 120
+
+
+def first_requests(paths, warm, profile, results):
+    """Fresh interpreter: optionally warm up, then time each first hit."""
+    report = None
+    try:
+        os.environ['YATUBE_TEMPLATES_PROFILE'] = profile
+        # Not yatube.wsgi: it would warm up on import and register this
+        # process as a server whose metrics get flushed.
+        from django.core.wsgi import get_wsgi_application
+        application = get_wsgi_application()
+
+        from posts import warmup
+        from posts.benchmark import Case, Runner, isolated
+
+        logging.getLogger('django.request').setLevel(logging.ERROR)
+        with isolated():
+            warmup_ms = warmup.run()['seconds'] * 1000 if warm else 0.0
+            # Empty caches for every request, so both modes render every
+            # page; the scratch cache keeps the live one untouched.
+            runner = Runner(application, cold=True)
+            timings = [
+                runner.request(Case('first', 'anon', path))[0] * 1000
+                for path in paths
+            ]
+        report = (warmup_ms, timings)
+    except Exception:
+        report = traceback.format_exc()
+    finally:
+        # Always report, or the parent would wait forever.
+        results.put(report)
+
+
+class Command(BaseCommand):
+    help = (
+        'Start fresh worker processes with and without the startup '
+        'warm-up and compare the latency of their first requests.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rounds', type=int, default=5,
+                            help='Fresh processes per mode.')
+        parser.add_argument('--profile', default='production',
+                            choices=('default', 'production'),
+                            help='Template loading profile of the workers.')
+
+    def measure(self, paths, warm, profile, rounds):
+        # Spawned, not forked: a fork would inherit this process's state.
+        context = multiprocessing.get_context('spawn')
+        samples = []
+        for _ in range(rounds):
+            results = context.Queue()
+            process = context.Process(
+                target=first_requests,
+                args=(paths, warm, profile, results),
+            )
+            process.start()
+            try:
+                sample = results.get(timeout=TIMEOUT)
+            except queue.Empty:
+                raise CommandError('A worker died without reporting.')
+            finally:
+                if process.is_alive():
+                    process.terminate()
+                process.join()
+            if not isinstance(sample, tuple):
+                raise CommandError(f'A worker failed:\n{sample}')
+            samples.append(sample)
+        warmup_ms = statistics.median(sample[0] for sample in samples)
+        timings = [
+            statistics.median(sample[1][index] for sample in samples)
+            for index in range(len(paths))
+        ]
+        return warmup_ms, timings
+
+    def handle(self, *args, **options):
+        paths = [
+            reverse('index'),
+            reverse('search') + '?q=warm',
+            reverse('signup'),
+            reverse('login'),
+            reverse('404_error'),
+        ]
+        _, cold = self.measure(
+            paths, False, options['profile'], options['rounds'],
+        )
+        warm_setup, warm = self.measure(
+            paths, True, options['profile'], options['rounds'],
+        )
+        self.stdout.write(
+            f"{'first request':24} {'cold ms':>9} {'warm ms':>9}"
+        )
+        for path, before, after in zip(paths, cold, warm):
+            self.stdout.write(f'{path:24} {before:9.1f} {after:9.1f}')
+        self.stdout.write(
+            f"{'total':24} {sum(cold):9.1f} {sum(warm):9.1f}"
+        )
+        self.stdout.write(
+            f'Warm-up before accepting traffic: {warm_setup:.1f} ms '
+            f'(median of {options["rounds"]} workers)'
+        )
@@ -0,0 +1,77 @@
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from posts import timeline
+from posts.models import Follow, Group, Post, User
+from posts.paginator import CursorPaginator
+
+
+def unindexed(detail):
+    """Plan steps that sort in memory or walk a table without an index."""
+    if 'USE TEMP B-TREE' in detail:
+        return True
+    return detail.startswith('SCAN') and 'USING' not in detail
+
+
+class Command(BaseCommand):
+    help = (
+        'Print EXPLAIN QUERY PLAN for the queries behind each feed view '
+        'and check that they are served by indexes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Fail when a plan sorts in memory or scans a whole table.',
+        )
+
+    def feed_queries(self):
+        user = User.objects.first() or User(pk=1)
+        group = Group.objects.first() or Group(pk=1)
+        post = Post.objects.first() or Post(pk=1, author=user)
+        boundary = (datetime.now(timezone.utc), 1)
+
+        def pages(name, queryset, **kwargs):
+            paginator = CursorPaginator(queryset, **kwargs)
+            yield name, paginator.object_list[:paginator.per_page + 1]
+            after = paginator._after(*boundary)
+            yield f'{name} (after cursor)', after[:paginator.per_page + 1]
+
+        yield from pages('index', Post.objects.for_feed())
+        yield from pages('group', group.posts.for_feed())
+        yield from pages('profile', user.posts.for_feed())
+        yield from pages(
+            'follow_index',
+            timeline.feed(user).for_feed(),
+            keys=timeline.FEED_KEYS,
+        )
+        yield from pages(
+            'post comments', post.comments.select_related('author'),
+        )
+        yield 'follow lookup', Follow.objects.filter(
+            user=user, author=post.author,
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('EXPLAIN QUERY PLAN needs SQLite.')
+        failed = []
+        for name, queryset in self.feed_queries():
+            sql, params = queryset.query.sql_with_params()
+            with connection.cursor() as cursor:
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+                plan = [row[-1] for row in cursor.fetchall()]
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            for detail in plan:
+                bad = unindexed(detail)
+                style = self.style.WARNING if bad else self.style.SUCCESS
+                self.stdout.write(style(f'  {detail}'))
+                if bad:
+                    failed.append(name)
+        if options['check'] and failed:
+            raise CommandError(
+                'Not served by an index: ' + ', '.join(sorted(set(failed)))
+            )
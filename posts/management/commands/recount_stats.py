@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.counters import recount
+
+
+class Command(BaseCommand):
+    help = 'Recompute post, comment and follow counters and fix any drift.'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            repaired = recount()
+        for counter, rows in repaired.items():
+            style = self.style.WARNING if rows else self.style.SUCCESS
+            self.stdout.write(style(f'{counter}: {rows} row(s) repaired'))
@@ -0,0 +1,61 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.seed import Seeder
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate a reproducible synthetic dataset (users, groups, posts, '
+        'comments and a power-law follow graph) with batched bulk inserts.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=30000)
+        parser.add_argument(
+            '--follows', type=float, default=20,
+            help='Mean number of authors each user follows.',
+        )
+        parser.add_argument(
+            '--images', type=float, default=0,
+            help='Share of posts (0..1) that get a generated image.',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--skew', type=float, default=1.1,
+            help='Power-law exponent of author popularity.',
+        )
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='Spread post dates over this many days up to now.',
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        if options['users'] < 1:
+            raise CommandError('At least one user is needed to author posts.')
+        if not 0 <= options['images'] <= 1:
+            raise CommandError('--images is a share between 0 and 1.')
+        started = time.monotonic()
+        counts = Seeder(
+            seed=options['seed'],
+            skew=options['skew'],
+            days=options['days'],
+            batch_size=options['batch_size'],
+        ).run(
+            users=options['users'],
+            groups=options['groups'],
+            posts=options['posts'],
+            comments=options['comments'],
+            follows=options['follows'],
+            image_share=options['images'],
+        )
+        for model, rows in counts.items():
+            self.stdout.write(f'{model}: {rows} row(s)')
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded in {time.monotonic() - started:.1f} s'
+        ))
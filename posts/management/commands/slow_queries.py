@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import slowlog
+
+
+class Command(BaseCommand):
+    help = 'Rank the slow-query log by total time per SQL fingerprint.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=10)
+        parser.add_argument('--view', help='Only queries of this URL name.')
+        parser.add_argument('--log', help='Log file to read.')
+
+    def handle(self, *args, **options):
+        try:
+            entries = list(slowlog.read(options['log']))
+        except FileNotFoundError as error:
+            raise CommandError(f'No slow-query log at {error.filename}.')
+        if options['view']:
+            entries = [
+                entry for entry in entries if entry['view'] == options['view']
+            ]
+        groups = slowlog.summarize(entries)
+        self.stdout.write(
+            f'{len(entries)} slow queries, {len(groups)} fingerprints'
+        )
+        for group in groups[:options['top']]:
+            views = ', '.join(
+                f'{view} x{count}' for view, count in sorted(
+                    group['views'].items(), key=lambda item: -item[1],
+                )
+            )
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"{group['fingerprint']}  total {group['total_ms']:.1f} ms  "
+                f"count {group['count']}  "
+                f"mean {group['total_ms'] / group['count']:.1f} ms  "
+                f"max {group['max_ms']:.1f} ms"
+            ))
+            self.stdout.write(f'  views: {views}')
+            self.stdout.write(f"  sql:   {group['sql']}")
+            for frame in group['stack']:
+                self.stdout.write(f'    {frame}')
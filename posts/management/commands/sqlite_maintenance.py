@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from posts.sqlite import wal_size
+
+
+class Command(BaseCommand):
+    help = (
+        'Run ANALYZE (and optionally VACUUM / a WAL checkpoint) on the '
+        'SQLite database and report how large the WAL has grown.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--vacuum',
+            action='store_true',
+            help='Rebuild the database file to reclaim free pages.',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            action='store_true',
+            help='Copy the WAL into the database and truncate it.',
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('sqlite_maintenance needs SQLite.')
+        self.stdout.write(f'WAL size before: {wal_size(connection)} bytes')
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.stdout.write(f'Journal mode: {cursor.fetchone()[0]}')
+            cursor.execute('ANALYZE')
+            self.stdout.write(self.style.SUCCESS('ANALYZE done'))
+            if options['vacuum']:
+                cursor.execute('VACUUM')
+                self.stdout.write(self.style.SUCCESS('VACUUM done'))
+            if options['checkpoint']:
+                cursor.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+                busy, log, done = cursor.fetchone()
+                self.stdout.write(
+                    f'Checkpoint: {done}/{log} frames copied, busy={busy}'
+                )
+        self.stdout.write(f'WAL size after: {wal_size(connection)} bytes')
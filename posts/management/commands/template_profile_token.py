@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from posts import profiling
+
+
+class Command(BaseCommand):
+    help = (
+        'Print a signed X-Template-Profile header value that turns on '
+        'template profiling for a request (valid for a day).'
+    )
+
+    def handle(self, *args, **options):
+        self.stdout.write(profiling.token())
@@ -0,0 +1,332 @@
+"""Prometheus-style request metrics shared by every worker process.
+
+Each process keeps its own counters and histograms in memory. Server
+processes, which call `serve()` from yatube/wsgi.py, also write them to
+`METRICS_DIR/<pid>.json`, readable by their owner only, at most every
+`METRICS_FLUSH_INTERVAL` seconds and on exit; management commands and
+test runs keep theirs to themselves. The `/metrics/` view sums the files
+of all processes, so scraping any worker sees the whole server. Values are cumulative, like
+Prometheus' own multiprocess mode, so files of exited workers keep
+counting until the directory is cleared on deploy.
+
+Everything is labelled by the URL name of the request (`index`,
+`profile`, ...), which `MetricsMiddleware` records for the duration of
+the request. Only staff users and scrapers presenting `METRICS_TOKEN`
+may read them.
+"""
+import atexit
+import bisect
+import glob
+import hmac
+import json
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import (
+    DjangoTemplates, Template as DjangoTemplate, reraise,
+)
+
+
+BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0,
+)
+METRICS_DIR = getattr(
+    settings,
+    'METRICS_DIR',
+    os.path.join(settings.BASE_DIR, 'var', 'metrics'),
+)
+FLUSH_INTERVAL = getattr(settings, 'METRICS_FLUSH_INTERVAL', 1.0)
+UNMATCHED = 'unmatched'
+
+COUNTERS = {
+    'yatube_responses_total': 'Responses by URL name and status code.',
+    'yatube_db_queries_total': 'Database queries run by URL name.',
+    'yatube_db_query_seconds_total': 'Time spent in database queries.',
+    'yatube_cache_requests_total':
+        'Page and fragment cache lookups by result.',
+}
+HISTOGRAMS = {
+    'yatube_request_duration_seconds': 'Request latency by URL name.',
+    'yatube_template_render_seconds': 'Template render time by URL name.',
+}
+
+_local = threading.local()
+
+
+def current_view():
+    return getattr(_local, 'view', UNMATCHED)
+
+
+def set_current_view(name):
+    _local.view = name or UNMATCHED
+
+
+class Registry:
+    """Counters and histograms of this process, keyed by label tuples."""
+
+    def __init__(self, directory=METRICS_DIR):
+        self.directory = directory
+        self.lock = threading.Lock()
+        self.pid = os.getpid()
+        self.counters = {}
+        self.histograms = {}
+        self.flushed = 0.0
+        self.serving = False
+
+    def _forked(self):
+        # A worker forked from a loaded parent starts from zero, or the
+        # parent's values would be counted once per worker.
+        if self.pid != os.getpid():
+            self.pid = os.getpid()
+            self.counters, self.histograms = {}, {}
+
+    def inc(self, name, labels, amount=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self._forked()
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, labels, value):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self._forked()
+            buckets = self.histograms.get(key)
+            if buckets is None:
+                # One slot per bucket, then +Inf, then the sum.
+                buckets = self.histograms[key] = [0] * (len(BUCKETS) + 2)
+            buckets[bisect.bisect_left(BUCKETS, value)] += 1
+            buckets[-1] += value
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'counters': [
+                    [name, labels, value]
+                    for (name, labels), value in self.counters.items()
+                ],
+                'histograms': [
+                    [name, labels, list(buckets)]
+                    for (name, labels), buckets in self.histograms.items()
+                ],
+            }
+
+    def path(self, pid=None):
+        return os.path.join(self.directory, f'{pid or os.getpid()}.json')
+
+    def flush(self):
+        if not self.directory:
+            return
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        path = self.path()
+        partial = f'{path}.tmp'
+        descriptor = os.open(
+            partial, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600,
+        )
+        with os.fdopen(descriptor, 'w') as stream:
+            json.dump(self.snapshot(), stream)
+        os.replace(partial, path)
+        self.flushed = time.monotonic()
+
+    def maybe_flush(self):
+        if (self.serving
+                and time.monotonic() - self.flushed >= FLUSH_INTERVAL):
+            self.flush()
+
+    def collect(self):
+        """Sum of every process' metrics, this one's up to date."""
+        snapshots = [_parse(self.snapshot())]
+        if self.directory:
+            own = self.path()
+            for path in glob.glob(os.path.join(self.directory, '*.json')):
+                if path == own:
+                    continue
+                try:
+                    with open(path) as stream:
+                        snapshots.append(_parse(json.load(stream)))
+                except (
+                    OSError, ValueError, KeyError, TypeError, AttributeError,
+                ):
+                    # Unreadable, torn or not a snapshot at all.
+                    continue
+        counters, histograms = {}, {}
+        for snapshot_counters, snapshot_histograms in snapshots:
+            for key, value in snapshot_counters:
+                counters[key] = counters.get(key, 0) + value
+            for key, buckets in snapshot_histograms:
+                total = histograms.setdefault(key, [0] * len(buckets))
+                for index, value in enumerate(buckets):
+                    total[index] += value
+        return counters, histograms
+
+    def clear(self):
+        with self.lock:
+            self.counters.clear()
+            self.histograms.clear()
+        if self.directory:
+            for path in glob.glob(os.path.join(self.directory, '*.json')):
+                os.remove(path)
+
+
+def _number(value):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise TypeError(f'Not a metric value: {value!r}')
+    return value
+
+
+def _parse(snapshot):
+    """`(counters, histograms)` of a snapshot as `(key, value)` pairs."""
+    counters = [
+        ((name, tuple(map(tuple, labels))), _number(value))
+        for name, labels, value in snapshot['counters']
+    ]
+    histograms = []
+    for name, labels, buckets in snapshot['histograms']:
+        if len(buckets) != len(BUCKETS) + 2:
+            raise ValueError(f'Bad bucket count for {name}')
+        histograms.append((
+            (name, tuple(map(tuple, labels))),
+            [_number(value) for value in buckets],
+        ))
+    return counters, histograms
+
+
+registry = Registry()
+
+
+def serve():
+    """Share this process' metrics with the other workers."""
+    registry.serving = True
+    atexit.register(registry.flush)
+
+
+def _format_labels(labels, **extra):
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ''
+    body = ','.join(
+        '{}="{}"'.format(
+            key, str(value).replace('\\', r'\\').replace('"', r'\"'),
+        )
+        for key, value in pairs
+    )
+    return '{' + body + '}'
+
+
+def _format_number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def authorized(request):
+    """Staff, or a scraper sending `Authorization: Bearer <token>`."""
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token and hmac.compare_digest(
+        request.META.get('HTTP_AUTHORIZATION', '').encode(),
+        f'Bearer {token}'.encode(),
+    ):
+        return True
+    return request.user.is_staff
+
+
+def exposition():
+    """Every metric in the Prometheus text format."""
+    counters, histograms = registry.collect()
+    lines = []
+    for name, help_text in COUNTERS.items():
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+        for (metric, labels), value in sorted(counters.items()):
+            if metric == name:
+                lines.append(
+                    f'{name}{_format_labels(labels)} {_format_number(value)}'
+                )
+    for name, help_text in HISTOGRAMS.items():
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+        for (metric, labels), buckets in sorted(histograms.items()):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(BUCKETS + ('+Inf',), buckets):
+                cumulative += count
+                lines.append(
+                    f'{name}_bucket{_format_labels(labels, le=bound)} '
+                    f'{cumulative}'
+                )
+            lines.append(
+                f'{name}_sum{_format_labels(labels)} '
+                f'{_format_number(buckets[-1])}'
+            )
+            lines.append(f'{name}_count{_format_labels(labels)} {cumulative}')
+    return '\n'.join(lines) + '\n'
+
+
+class QueryTimer:
+    """`connection.execute_wrapper` that counts and times queries."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - started
+
+
+def observe_request(view, status, seconds, queries):
+    registry.observe(
+        'yatube_request_duration_seconds', {'view': view}, seconds,
+    )
+    registry.inc(
+        'yatube_responses_total', {'view': view, 'status': str(status)},
+    )
+    registry.inc('yatube_db_queries_total', {'view': view}, queries.count)
+    registry.inc(
+        'yatube_db_query_seconds_total', {'view': view}, queries.seconds,
+    )
+    registry.maybe_flush()
+
+
+def observe_template(seconds):
+    registry.observe(
+        'yatube_template_render_seconds', {'view': current_view()}, seconds,
+    )
+
+
+def cache_lookup(cache_name, result):
+    """`result` is 'hit', 'miss' or 'stale' (served while rebuilding)."""
+    registry.inc('yatube_cache_requests_total', {
+        'view': current_view(),
+        'cache': cache_name,
+        'result': result,
+    })
+
+
+class TimedTemplate(DjangoTemplate):
+    def render(self, context=None, request=None):
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            observe_template(time.perf_counter() - started)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """Django template backend reporting each top-level render.
+
+    Includes and extended templates are rendered by the engine inside
+    the outer render, so every response is timed exactly once.
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
@@ -0,0 +1,64 @@
+import random
+import time
+
+from django.db import connection
+
+from . import metrics, profiling, slowlog
+
+
+class MetricsMiddleware:
+    """Time every request and count its queries, by URL name.
+
+    Goes first in MIDDLEWARE so the histogram covers the whole stack.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics.set_current_view(None)
+        queries = metrics.QueryTimer()
+        started = time.perf_counter()
+        try:
+            with connection.execute_wrapper(queries):
+                response = self.get_response(request)
+            match = request.resolver_match
+            metrics.observe_request(
+                match.url_name if match else metrics.UNMATCHED,
+                response.status_code,
+                time.perf_counter() - started,
+                queries,
+            )
+        finally:
+            metrics.set_current_view(None)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        metrics.set_current_view(request.resolver_match.url_name)
+
+
+class SlowQueryMiddleware:
+    """Log slow queries of a sampled share of requests."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= slowlog.SAMPLE_RATE:
+            return self.get_response(request)
+        with connection.execute_wrapper(slowlog.SlowQueryWrapper()):
+            return self.get_response(request)
+
+
+class TemplateProfileMiddleware:
+    """Report template render times of profiled requests in headers."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not profiling.requested(request):
+            return self.get_response(request)
+        with profiling.profiling() as profile:
+            response = self.get_response(request)
+        return profiling.annotate(response, profile)
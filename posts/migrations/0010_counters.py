@@ -0,0 +1,52 @@
+# Generated by Django 2.2.28 on 2026-10-18 18:30
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_counters(apps, schema_editor):
+    Comment = apps.get_model('posts', 'Comment')
+    Follow = apps.get_model('posts', 'Follow')
+    Post = apps.get_model('posts', 'Post')
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    UserStats = apps.get_model('posts', 'UserStats')
+    for post in Post.objects.order_by().annotate(
+        total=models.Count('comments'),
+    ):
+        Post.objects.filter(pk=post.pk).update(comment_count=post.total)
+    UserStats.objects.bulk_create(
+        UserStats(
+            user_id=user.pk,
+            posts=Post.objects.filter(author_id=user.pk).count(),
+            followers=Follow.objects.filter(author_id=user.pk).count(),
+            following=Follow.objects.filter(user_id=user.pk).count(),
+        )
+        for user in User.objects.all()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0009_timelineentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('posts', models.PositiveIntegerField(default=0)),
+                ('followers', models.PositiveIntegerField(default=0)),
+                ('following', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
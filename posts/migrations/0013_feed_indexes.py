@@ -0,0 +1,102 @@
+# Generated by Django 2.2.28 on 2026-10-18 18:37
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def drop_duplicate_follows(apps, schema_editor):
+    """Keep the first of each follow and recount the users involved.
+
+    The rows are deleted without signals, so the counters and the
+    timeline are fixed here. An author whose recount falls to the
+    fan-out limit is no longer pulled at read time: their followers get
+    the recent posts the fan-out skipped.
+    """
+    Follow = apps.get_model('posts', 'Follow')
+    Post = apps.get_model('posts', 'Post')
+    TimelineEntry = apps.get_model('posts', 'TimelineEntry')
+    UserStats = apps.get_model('posts', 'UserStats')
+    fanout_limit = getattr(settings, 'TIMELINE_FANOUT_LIMIT', 1000)
+    backfill_limit = getattr(settings, 'TIMELINE_BACKFILL_LIMIT', 200)
+    duplicates = (
+        Follow.objects.values('author_id', 'user_id')
+        .annotate(first=models.Min('id'), total=models.Count('id'))
+        .filter(total__gt=1)
+    )
+    author_ids, user_ids = set(), set()
+    for row in duplicates:
+        Follow.objects.filter(
+            author_id=row['author_id'],
+            user_id=row['user_id'],
+        ).exclude(id=row['first']).delete()
+        author_ids.add(row['author_id'])
+        user_ids.add(row['user_id'])
+    for user_id in user_ids:
+        UserStats.objects.filter(user_id=user_id).update(
+            following=Follow.objects.filter(user_id=user_id).count(),
+        )
+    for author_id in author_ids:
+        stats = UserStats.objects.filter(user_id=author_id)
+        was_pulled = stats.filter(followers__gt=fanout_limit).exists()
+        followers = Follow.objects.filter(author_id=author_id).count()
+        stats.update(followers=followers)
+        if not was_pulled or followers > fanout_limit:
+            continue
+        recent = Post.objects.filter(author_id=author_id).order_by(
+            '-pub_date',
+        ).values_list('pk', 'pub_date')[:backfill_limit]
+        TimelineEntry.objects.bulk_create(
+            [
+                TimelineEntry(
+                    user_id=user_id,
+                    post_id=post_id,
+                    author_id=author_id,
+                    pub_date=pub_date,
+                )
+                for user_id in Follow.objects.filter(
+                    author_id=author_id,
+                ).values_list('user_id', flat=True)
+                for post_id, pub_date in recent
+            ],
+            batch_size=500,
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_post_fts'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_follows, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='timelineentry',
+            name='timeline_user_date_idx',
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'pub_date'], name='comment_post_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['pub_date'], name='post_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['group', 'pub_date'], name='post_group_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', 'pub_date'], name='post_author_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timelineentry',
+            index=models.Index(fields=['user', 'pub_date', 'post'], name='timeline_user_feed_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.UniqueConstraint(fields=('author', 'user'), name='following_unique'),
+        ),
+    ]
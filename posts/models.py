@@ -21,6 +21,12 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        """Everything post_item.html reads, fetched with the page."""
+        return self.select_related('author', 'group')
+
+
 class Post(models.Model):
     text = models.TextField()
     pub_date = models.DateTimeField(
@@ -28,6 +34,11 @@ class Post(models.Model):
         auto_now_add=True,
     )
 
+    updated = models.DateTimeField(
+        'date updated',
+        auto_now=True,
+    )
+
     author = models.ForeignKey(
         User, 
         on_delete=models.CASCADE,
@@ -48,8 +59,31 @@ class Post(models.Model):
         null=True
     )  
 
+    comment_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+    )
+
+    objects = PostQuerySet.as_manager()
+
     class Meta:
         ordering = ('-pub_date',)
+        # Ascending on purpose: SQLite walks them backwards for
+        # `-pub_date, -id`, because the implicit trailing rowid ascends.
+        indexes = (
+            models.Index(
+                fields=('pub_date',),
+                name='post_date_idx',
+            ),
+            models.Index(
+                fields=('group', 'pub_date'),
+                name='post_group_date_idx',
+            ),
+            models.Index(
+                fields=('author', 'pub_date'),
+                name='post_author_date_idx',
+            ),
+        )
 
     def __str__(self):
         return self.text
@@ -81,6 +115,12 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ('-pub_date',)
+        indexes = (
+            models.Index(
+                fields=('post', 'pub_date'),
+                name='comment_post_date_idx',
+            ),
+        )
 
 
 class Follow(models.Model):
@@ -97,8 +137,91 @@ class Follow(models.Model):
     )
     
     class Meta:
-        models.UniqueConstraint(
-            fields=('author', 'user'), 
-            name='followint_unique'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('author', 'user'), 
+                name='following_unique'
+            ),
+        )
+
+
+class UserStatsManager(models.Manager):
+    def add(self, user_id, **deltas):
+        """Shift the stored counters of `user_id` by `deltas`."""
+        changes = {
+            field: models.F(field) + delta for field, delta in deltas.items()
+        }
+        rows = self.filter(user_id=user_id)
+        if any(delta < 0 for delta in deltas.values()):
+            # Never create rows on the way down: the user may be mid-delete.
+            rows.filter(**{
+                f'{field}__gt': 0 for field, delta in deltas.items()
+                if delta < 0
+            }).update(**changes)
+        elif not rows.update(**changes):
+            self.get_or_create(user_id=user_id)
+            rows.update(**changes)
+
+    def for_user(self, user):
+        """Stored counters of `user`; an unsaved zero row if none yet."""
+        return getattr(user, 'stats', None) or self.model(user=user)
+
+
+class UserStats(models.Model):
+    """Denormalized per-user counters shown on the profile card."""
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+    )
+
+    posts = models.PositiveIntegerField(default=0)
+    followers = models.PositiveIntegerField(default=0)
+    following = models.PositiveIntegerField(default=0)
+
+    objects = UserStatsManager()
+
+
+class TimelineEntry(models.Model):
+    """Materialized follow feed row: `post` delivered to `user`."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+    )
+
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+    )
+
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        ordering = ('-pub_date',)
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'post'),
+                name='timeline_unique',
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('user', 'pub_date', 'post'),
+                name='timeline_user_feed_idx',
+            ),
+            models.Index(
+                fields=('user', 'author'),
+                name='timeline_user_author_idx',
+            ),
         )
-        
\ No newline at end of file
@@ -0,0 +1,157 @@
+"""Keyset pagination for post feeds.
+
+Pages are addressed by opaque `?after=` / `?before=` tokens holding the
+`(pub_date, id)` of the boundary post (or other `keys` of the rows), so
+each request reads one page plus one row and never runs `COUNT(*)` or a
+deep OFFSET scan. Legacy `?page=N` links are still served for the
+first `LEGACY_PAGE_LIMIT` pages.
+
+The context keeps a regular `Paginator` and `Page` for compatibility;
+the paginator's count stays lazy and templates navigate with `cursor`.
+"""
+import base64
+import binascii
+
+from django.conf import settings
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+PAGE_SIZE = 10
+COMMENT_PAGE_SIZE = 20
+POST_KEYS = ('pub_date', 'pk')
+LEGACY_PAGE_LIMIT = getattr(settings, 'LEGACY_PAGE_LIMIT', 5)
+
+
+def encode_cursor(pub_date, pk, number):
+    raw = f'{pub_date.isoformat()}|{pk}|{number}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Return `(pub_date, pk, number)` or None for a malformed token."""
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        pub_date, pk, number = raw.split('|')
+        pub_date = parse_datetime(pub_date)
+        if pub_date is None:
+            return None
+        return pub_date, int(pk), int(number)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        return None
+
+
+class Cursor:
+    """Navigation state of a keyset page, rendered by paginator.html."""
+
+    def __init__(self, number, next_token=None, previous_token=None):
+        self.number = number
+        self.next_token = next_token
+        self.previous_token = previous_token
+
+    @property
+    def has_next(self):
+        return self.next_token is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_token is not None
+
+    @property
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+
+class CursorPaginator:
+    def __init__(self, object_list, per_page=PAGE_SIZE,
+                 legacy_limit=LEGACY_PAGE_LIMIT, keys=POST_KEYS):
+        self.date_key, self.id_key = keys
+        self.object_list = object_list.order_by(
+            f'-{self.date_key}', f'-{self.id_key}',
+        )
+        self.per_page = per_page
+        self.legacy_limit = legacy_limit
+
+    def _boundary(self, pub_date, pk, direction):
+        # `date <= d AND (date < d OR id < pk)` keeps the date range
+        # sargable, so SQLite walks the index instead of sorting.
+        date, ident = self.date_key, self.id_key
+        return Q(**{f'{date}__{direction}e': pub_date}) & (
+            Q(**{f'{date}__{direction}': pub_date})
+            | Q(**{f'{ident}__{direction}': pk})
+        )
+
+    def _after(self, pub_date, pk):
+        return self.object_list.filter(self._boundary(pub_date, pk, 'lt'))
+
+    def _before(self, pub_date, pk):
+        return self.object_list.filter(
+            self._boundary(pub_date, pk, 'gt')
+        ).order_by(self.date_key, self.id_key)
+
+    def _encode(self, row, number):
+        if isinstance(row, dict):
+            # Rows of a `.values()` queryset.
+            return encode_cursor(row[self.date_key], row[self.id_key], number)
+        return encode_cursor(
+            getattr(row, self.date_key), getattr(row, self.id_key), number,
+        )
+
+    def _legacy_number(self, value):
+        try:
+            number = int(value)
+        except (TypeError, ValueError):
+            return 1
+        if 1 <= number <= self.legacy_limit:
+            return number
+        return 1
+
+    def get_page(self, params):
+        """Return `(rows, cursor)` for the request's query parameters."""
+        size = self.per_page
+        after = decode_cursor(params.get('after'))
+        before = decode_cursor(params.get('before'))
+        if after is not None:
+            pub_date, pk, number = after
+            rows = list(self._after(pub_date, pk)[:size + 1])
+            has_next, has_previous = len(rows) > size, True
+            rows, number = rows[:size], number + 1
+        elif before is not None:
+            pub_date, pk, number = before
+            rows = list(self._before(pub_date, pk)[:size + 1])
+            if not rows:
+                return self.get_page({})
+            has_next, has_previous = True, len(rows) > size
+            rows, number = rows[:size][::-1], max(number - 1, 1)
+        else:
+            number = self._legacy_number(params.get('page'))
+            offset = (number - 1) * size
+            rows = list(self.object_list[offset:offset + size + 1])
+            has_next, has_previous = len(rows) > size, number > 1
+            rows = rows[:size]
+        if not rows:
+            return rows, Cursor(number)
+        return rows, Cursor(
+            number,
+            next_token=self._encode(rows[-1], number) if has_next else None,
+            previous_token=(
+                self._encode(rows[0], number) if has_previous else None
+            ),
+        )
+
+
+def paginate(request, object_list, per_page=PAGE_SIZE, keys=POST_KEYS):
+    """Context entries for a keyset-paginated feed."""
+    rows, cursor = CursorPaginator(
+        object_list, per_page, keys=keys,
+    ).get_page(request.GET)
+    paginator = Paginator(object_list, per_page)
+    return {
+        'page': Page(rows, cursor.number, paginator),
+        'paginator': paginator,
+        'cursor': cursor,
+    }
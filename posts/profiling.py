@@ -0,0 +1,127 @@
+"""Per-request template render profiler.
+
+While a request is profiled every `Template._render` call is timed, so
+each page template, `{% extends %}` parent and `{% include %}` gets a
+call count, cumulative time and self time (cumulative minus the
+templates rendered inside it). The result is returned in the
+`X-Template-Profile` and `Server-Timing` response headers; the latter
+shows up in the browser's network panel.
+
+Profiling is on for every request with `TEMPLATE_PROFILING = True`, or
+for single requests carrying a header signed with the project's secret
+key (see `manage.py template_profile_token`).
+"""
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.core import signing
+from django.template.base import Template
+
+
+HEADER = 'HTTP_X_TEMPLATE_PROFILE'
+SALT = 'posts.profiling'
+TOKEN_MAX_AGE = 60 * 60 * 24
+TOKEN_VALUE = 'template-profile'
+HEADER_ROWS = 20
+
+_state = threading.local()
+
+
+class Profile:
+    def __init__(self):
+        self.stats = {}
+        self.stack = []
+
+    def enter(self, name):
+        self.stack.append([name, time.perf_counter(), 0.0])
+
+    def exit(self):
+        name, started, children = self.stack.pop()
+        total = time.perf_counter() - started
+        if self.stack:
+            self.stack[-1][2] += total
+        count, cumulative, own = self.stats.get(name, (0, 0.0, 0.0))
+        self.stats[name] = (
+            count + 1, cumulative + total, own + total - children,
+        )
+
+    def rows(self):
+        """`(name, count, cumulative ms, self ms)`, largest self first."""
+        return sorted(
+            (
+                (name, count, cumulative * 1000, own * 1000)
+                for name, (count, cumulative, own) in self.stats.items()
+            ),
+            key=lambda row: -row[3],
+        )
+
+
+def _profiled(render):
+    @wraps(render)
+    def wrapper(self, context):
+        profile = getattr(_state, 'profile', None)
+        if profile is None:
+            return render(self, context)
+        profile.enter(self.name or '<string>')
+        try:
+            return render(self, context)
+        finally:
+            profile.exit()
+    wrapper.profiled = True
+    return wrapper
+
+
+def install():
+    """Wrap `Template._render` once; cheap for unprofiled requests.
+
+    Done lazily rather than at startup because the test runner swaps in
+    its own `_render` after the apps are loaded.
+    """
+    if not getattr(Template._render, 'profiled', False):
+        Template._render = _profiled(Template._render)
+
+
+@contextmanager
+def profiling():
+    install()
+    _state.profile = Profile()
+    try:
+        yield _state.profile
+    finally:
+        _state.profile = None
+
+
+def token():
+    return signing.dumps(TOKEN_VALUE, salt=SALT)
+
+
+def requested(request):
+    if getattr(settings, 'TEMPLATE_PROFILING', False):
+        return True
+    value = request.META.get(HEADER)
+    if not value:
+        return False
+    try:
+        return signing.loads(
+            value, salt=SALT, max_age=TOKEN_MAX_AGE,
+        ) == TOKEN_VALUE
+    except signing.BadSignature:
+        return False
+
+
+def annotate(response, profile):
+    rows = profile.rows()[:HEADER_ROWS]
+    response['X-Template-Profile'] = ', '.join(
+        f'{name};count={count};cum={cumulative:.2f};self={own:.2f}'
+        for name, count, cumulative, own in rows
+    ) or 'none'
+    timings = ', '.join(
+        f'tpl{index};dur={own:.2f};desc="{name} x{count}"'
+        for index, (name, count, cumulative, own) in enumerate(rows)
+    )
+    if timings:
+        response['Server-Timing'] = timings
+    return response
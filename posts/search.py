@@ -0,0 +1,80 @@
+"""Full-text search over posts backed by an SQLite FTS5 index.
+
+`posts_post_fts` holds the text of every post under the post id as its
+rowid. Post save/delete signals keep it in step; writes that bypass
+signals (`bulk_create`, `update()`) are picked up by `rebuild()`. Other
+database backends fall back to a plain `icontains` filter.
+"""
+from django.db import connection
+
+from .models import Post
+
+
+FTS_TABLE = 'posts_post_fts'
+
+
+def fts_available():
+    return connection.vendor == 'sqlite'
+
+
+def fts_query(text):
+    """Quote each word so user input is never parsed as FTS syntax."""
+    words = text.split()
+    return ' '.join('"{}"'.format(word.replace('"', '""')) for word in words)
+
+
+def index_post(post):
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post.pk]
+        )
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE}(rowid, text) VALUES (%s, %s)',
+            [post.pk, post.text],
+        )
+
+
+def unindex_post(post_id):
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id])
+
+
+def rebuild():
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE}(rowid, text) '
+            f'SELECT id, text FROM {Post._meta.db_table}'
+        )
+
+
+def matching_ids(text, limit, offset=0):
+    """Ids of posts matching `text`, best bm25 rank first."""
+    query = fts_query(text)
+    if not query:
+        return []
+    if not fts_available():
+        return list(
+            Post.objects.filter(text__icontains=text)
+            .values_list('pk', flat=True)[offset:offset + limit]
+        )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+            'ORDER BY rank LIMIT %s OFFSET %s',
+            [query, limit, offset],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def search(text, limit, offset=0):
+    """Posts matching `text` in rank order, ready for post_item.html."""
+    ids = matching_ids(text, limit, offset)
+    posts = Post.objects.for_feed().in_bulk(ids)
+    return [posts[pk] for pk in ids if pk in posts]
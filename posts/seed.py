@@ -0,0 +1,270 @@
+"""Synthetic yatube dataset for benchmarks.
+
+Everything is generated from one `random.Random(seed)`. Users and
+groups go through `bulk_create`; the large tables are written as plain
+row tuples with `executemany`, so no model instance is built per row.
+Primary keys are assigned up front and never have to be read back.
+Popularity follows a power law: a few authors collect most follows and
+posts. Counters, follow timelines and the search index are filled for
+the new rows directly, since raw inserts skip the signals that normally
+maintain them.
+"""
+import io
+import itertools
+import random
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from . import cache, search, timeline
+from .models import (
+    Comment, Follow, Group, Post, TimelineEntry, User, UserStats,
+)
+
+
+PASSWORD = 'yatube-seed'
+IMAGE_POOL = 16
+WORDS = (
+    'день утро вечер город дорога море лес река книга письмо друг кот '
+    'собака поезд дом окно сад снег дождь солнце небо песня кофе чай '
+    'работа отпуск фото прогулка мост парк музей горы озеро ветер '
+    'сегодня вчера снова наконец очень тихо быстро вместе долго'
+).split()
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def next_pk(model):
+    return (model.objects.aggregate(top=Max('pk'))['top'] or 0) + 1
+
+
+class Seeder:
+    def __init__(self, seed=0, skew=1.1, days=365, batch_size=5000,
+                 now=None):
+        self.random = random.Random(seed)
+        self.seed = seed
+        self.skew = skew
+        self.days = days
+        self.batch_size = batch_size
+        self.now = now or timezone.now()
+        self.counts = {}
+
+    def create(self, model, objects):
+        total = 0
+        for chunk in chunked(objects, self.batch_size):
+            model.objects.bulk_create(chunk)
+            total += len(chunk)
+        self.counts[model._meta.model_name] = total
+
+    def insert(self, model, fields, rows):
+        """Write `rows` (tuples ordered like `fields`) in batches."""
+        opts = model._meta
+        columns = ', '.join(
+            connection.ops.quote_name(opts.get_field(name).column)
+            for name in fields
+        )
+        sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+            connection.ops.quote_name(opts.db_table),
+            columns,
+            ', '.join(['%s'] * len(fields)),
+        )
+        total = 0
+        with connection.cursor() as cursor:
+            for chunk in chunked(rows, self.batch_size):
+                cursor.executemany(sql, chunk)
+                total += len(chunk)
+        self.counts[opts.model_name] = total
+
+    def date(self, value):
+        return connection.ops.adapt_datetimefield_value(value)
+
+    def popularity(self, size):
+        """Cumulative power-law weights over a shuffled ranking."""
+        ranks = list(range(1, size + 1))
+        self.random.shuffle(ranks)
+        return list(itertools.accumulate(
+            1 / rank ** self.skew for rank in ranks
+        ))
+
+    def pick(self, population, weights):
+        return self.random.choices(population, cum_weights=weights)[0]
+
+    def text(self, low, high):
+        words = self.random.choices(WORDS, k=self.random.randint(low, high))
+        return ' '.join(words).capitalize() + '.'
+
+    def images(self, count):
+        from PIL import Image
+        names = []
+        for number in range(count):
+            name = f'posts/seed-{self.seed}-{number}.jpg'
+            if not default_storage.exists(name):
+                colour = tuple(self.random.randrange(256) for _ in range(3))
+                buffer = io.BytesIO()
+                Image.new('RGB', (1200, 800), colour).save(buffer, 'JPEG')
+                name = default_storage.save(
+                    name, ContentFile(buffer.getvalue()),
+                )
+            names.append(name)
+        return names
+
+    def users(self, count):
+        password = make_password(PASSWORD)
+        start = next_pk(User)
+        self.user_ids = list(range(start, start + count))
+        self.create(User, (
+            User(pk=pk, username=f'seed{pk}', password=password)
+            for pk in self.user_ids
+        ))
+        self.user_weights = self.popularity(count)
+
+    def groups(self, count):
+        start = next_pk(Group)
+        self.group_ids = list(range(start, start + count))
+        self.create(Group, (
+            Group(pk=pk, title=f'Группа {pk}', slug=f'seed-group-{pk}',
+                  description=self.text(5, 20))
+            for pk in self.group_ids
+        ))
+
+    def posts(self, count, image_share, comments):
+        pool = self.images(IMAGE_POOL) if image_share else []
+        start = next_pk(Post)
+        # (pk, author_id, pub_date) of every seeded post, oldest first.
+        offsets = sorted(
+            (self.random.uniform(0, self.days * 86400) for _ in range(count)),
+            reverse=True,
+        )
+        self.post_rows = [
+            (
+                pk,
+                self.pick(self.user_ids, self.user_weights),
+                self.now - timedelta(seconds=offset),
+            )
+            for pk, offset in zip(range(start, start + count), offsets)
+        ]
+        # Comments are aimed before the posts are written so that
+        # comment_count goes in with the post row.
+        self.comment_targets = [
+            self.random.randrange(count) for _ in range(comments)
+        ] if count else []
+        comment_counts = [0] * count
+        for index in self.comment_targets:
+            comment_counts[index] += 1
+
+        def build():
+            for (pk, author_id, pub_date), comment_count in zip(
+                self.post_rows, comment_counts,
+            ):
+                group_id = None
+                if self.group_ids and self.random.random() < 0.6:
+                    group_id = self.random.choice(self.group_ids)
+                image = ''
+                if pool and self.random.random() < image_share:
+                    image = self.random.choice(pool)
+                date = self.date(pub_date)
+                yield (
+                    pk, author_id, group_id, self.text(8, 60), image,
+                    date, date, comment_count,
+                )
+        self.insert(Post, (
+            'id', 'author', 'group', 'text', 'image',
+            'pub_date', 'updated', 'comment_count',
+        ), build())
+
+    def comments(self):
+        start = next_pk(Comment)
+
+        def build():
+            for pk, index in enumerate(self.comment_targets, start):
+                post_id, _, post_date = self.post_rows[index]
+                age = (self.now - post_date).total_seconds()
+                created = post_date + timedelta(
+                    seconds=self.random.uniform(0, min(age, 2 * 86400))
+                )
+                created = self.date(created)
+                yield (
+                    pk, post_id, self.random.choice(self.user_ids),
+                    self.text(2, 25), created, created,
+                )
+        self.insert(Comment, (
+            'id', 'post', 'author', 'text', 'created', 'pub_date',
+        ), build())
+
+    def follows(self, mean):
+        self.follow_pairs = []
+        if len(self.user_ids) < 2 or not mean:
+            self.counts['follow'] = 0
+            return
+        for user_id in self.user_ids:
+            wanted = min(
+                len(self.user_ids) - 1,
+                int(self.random.expovariate(1 / mean)),
+            )
+            authors = set()
+            for _ in range(wanted * 4):
+                if len(authors) == wanted:
+                    break
+                author_id = self.pick(self.user_ids, self.user_weights)
+                if author_id != user_id:
+                    authors.add(author_id)
+            self.follow_pairs.extend(
+                (user_id, author_id) for author_id in sorted(authors)
+            )
+        self.insert(Follow, ('user', 'author'), self.follow_pairs)
+
+    def stats(self):
+        posts, followers, following = {}, {}, {}
+        for _, author_id, _ in self.post_rows:
+            posts[author_id] = posts.get(author_id, 0) + 1
+        for user_id, author_id in self.follow_pairs:
+            followers[author_id] = followers.get(author_id, 0) + 1
+            following[user_id] = following.get(user_id, 0) + 1
+        self.followers = followers
+        self.insert(UserStats, ('user', 'posts', 'followers', 'following'), (
+            (pk, posts.get(pk, 0), followers.get(pk, 0), following.get(pk, 0))
+            for pk in self.user_ids
+        ))
+
+    def timelines(self):
+        """What `timeline.backfill` would deliver for every seeded follow."""
+        recent = {}
+        for post_id, author_id, pub_date in reversed(self.post_rows):
+            latest = recent.setdefault(author_id, [])
+            if len(latest) < timeline.BACKFILL_LIMIT:
+                latest.append((post_id, self.date(pub_date)))
+
+        def build():
+            for user_id, author_id in self.follow_pairs:
+                if self.followers.get(author_id, 0) > timeline.FANOUT_LIMIT:
+                    continue
+                for post_id, pub_date in recent.get(author_id, ()):
+                    yield user_id, post_id, author_id, pub_date
+        self.insert(
+            TimelineEntry, ('user', 'post', 'author', 'pub_date'), build(),
+        )
+
+    def run(self, users, groups, posts, comments, follows, image_share=0):
+        with transaction.atomic():
+            self.users(users)
+            self.groups(groups)
+            self.posts(posts, image_share, comments)
+            self.comments()
+            self.follows(follows)
+            self.stats()
+            self.timelines()
+            search.rebuild()
+        cache.bump('index_page')
+        return self.counts
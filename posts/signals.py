@@ -0,0 +1,226 @@
+from django.contrib.flatpages.models import FlatPage
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_migrate, post_save, pre_save,
+)
+from django.dispatch import receiver
+
+from . import cache, conditional, followed, search, tiered, timeline
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        timeline.fan_out(instance)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        timeline.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def prune_timeline(sender, instance, **kwargs):
+    timeline.prune(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Post)
+def count_new_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserStats.objects.add(instance.author_id, posts=1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    UserStats.objects.add(instance.author_id, posts=-1)
+
+
+@receiver(post_save, sender=Comment)
+def count_new_comment(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        Post.objects.filter(pk=instance.post_id).update(
+            comment_count=F('comment_count') + 1,
+        )
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    Post.objects.filter(pk=instance.post_id, comment_count__gt=0).update(
+        comment_count=F('comment_count') - 1,
+    )
+
+
+@receiver(post_save, sender=Follow)
+def count_new_follow(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserStats.objects.add(instance.author_id, followers=1)
+        UserStats.objects.add(instance.user_id, following=1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(sender, instance, **kwargs):
+    UserStats.objects.add(instance.author_id, followers=-1)
+    UserStats.objects.add(instance.user_id, following=-1)
+
+
+@receiver(post_delete, sender=Follow)
+def catch_up_timelines(sender, instance, **kwargs):
+    author_id = instance.author_id
+    if timeline.follower_count(author_id) == timeline.FANOUT_LIMIT:
+        # On commit: an author being deleted has no posts left by then.
+        transaction.on_commit(lambda: timeline.catch_up(author_id))
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def refresh_index_page(sender, **kwargs):
+    cache.bump('index_page')
+    # Bump again on commit: a page rebuilt before then saw the old rows.
+    transaction.on_commit(lambda: cache.bump('index_page'))
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def refresh_followed_authors(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    followed.forget(instance.user_id)
+    # Again on commit: a set reloaded before then missed the change.
+    transaction.on_commit(lambda: followed.forget(instance.user_id))
+
+
+@receiver(post_save, sender=Post)
+def index_post_text(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post_text(sender, instance, **kwargs):
+    search.unindex_post(instance.pk)
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_group(sender, instance, raw=False, **kwargs):
+    # An edit may move the post out of a group whose page showed it.
+    if instance.pk and not raw:
+        instance._previous_group_id, instance._previous_group = (
+            Post.objects.filter(pk=instance.pk).values_list(
+                'group_id', 'group__slug',
+            ).first() or (None, None)
+        )
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def refresh_post_pages(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    conditional.post_changed(
+        instance, getattr(instance, '_previous_group', None),
+    )
+    tags = [
+        f'post:{instance.pk}',
+        f'author:{instance.author_id}',
+        f'author-posts:{instance.author_id}',
+    ]
+    group_ids = {
+        instance.group_id, getattr(instance, '_previous_group_id', None),
+    }
+    tags += [f'group-posts:{pk}' for pk in group_ids if pk is not None]
+    cache.purge(*tags)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def refresh_comment_pages(sender, instance, raw=False, **kwargs):
+    if not raw:
+        conditional.comment_changed(instance)
+        cache.purge(f'post:{instance.post_id}')
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def refresh_follow_pages(sender, instance, raw=False, **kwargs):
+    if not raw:
+        conditional.follow_changed(instance)
+        cache.purge(
+            f'author:{instance.author_id}', f'author:{instance.user_id}',
+        )
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def refresh_group_pages(sender, instance, raw=False, **kwargs):
+    if not raw:
+        conditional.bump(conditional.GROUPS)
+        cache.purge(f'group:{instance.pk}')
+
+
+@receiver(pre_save, sender=User)
+def remember_username(sender, instance, raw=False, update_fields=None,
+                      **kwargs):
+    # A rename leaves pages under the old username behind.
+    if instance.pk and not raw and update_fields != frozenset(
+            {'last_login'}):
+        instance._previous_username = User.objects.filter(
+            pk=instance.pk,
+        ).values_list('username', flat=True).first()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def refresh_user_pages(sender, instance, raw=False, update_fields=None,
+                       **kwargs):
+    # Names show on the profile, post and group pages, and a deleted
+    # username may come back as somebody else. Logins only touch
+    # last_login.
+    if raw or update_fields == frozenset({'last_login'}):
+        return
+    if conditional.user_changed(
+        instance, getattr(instance, '_previous_username', None),
+    ):
+        cache.bump('index_page')
+        transaction.on_commit(lambda: cache.bump('index_page'))
+    cache.purge(f'author:{instance.pk}', f'user:{instance.pk}')
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def refresh_cached_groups(sender, raw=False, **kwargs):
+    if not raw:
+        tiered.groups.invalidate()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def refresh_cached_users(sender, raw=False, update_fields=None, **kwargs):
+    # A new user may take a username that was cached as missing.
+    if not raw and update_fields != frozenset({'last_login'}):
+        tiered.users.invalidate()
+
+
+@receiver(post_save, sender=FlatPage)
+@receiver(post_delete, sender=FlatPage)
+@receiver(m2m_changed, sender=FlatPage.sites.through)
+def refresh_cached_flatpages(sender, raw=False, **kwargs):
+    if not raw:
+        tiered.flatpages.invalidate()
+
+
+@receiver(post_migrate)
+def clear_caches(sender, **kwargs):
+    # Sent after migrate and after flush, which empties tables without
+    # signals: nothing cached from the old rows can be trusted.
+    if sender.name == 'posts':
+        for backend in caches.all():
+            backend.clear()
+        tiered.forget_all()
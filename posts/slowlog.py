@@ -0,0 +1,158 @@
+"""Sampled slow-query log.
+
+`SlowQueryMiddleware` installs `SlowQueryWrapper` through
+`connection.execute_wrapper` on a `SLOW_QUERY_SAMPLE_RATE` share of
+requests; unsampled requests pay nothing. Queries slower than
+`SLOW_QUERY_THRESHOLD_MS` are logged to the `posts.slow_queries` logger
+and appended as a JSON line to `SLOW_QUERY_LOG`, together with the URL
+name of the request, a fingerprint of the SQL with its literals masked
+and the project frames that issued it. Once the file reaches
+`SLOW_QUERY_LOG_MAX_BYTES` it is moved to `<log>.1`, replacing the
+previous one, so the log never takes more than twice that size.
+`manage.py slow_queries` ranks the fingerprints of both by total time.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+import traceback
+from datetime import datetime, timezone
+
+from django.conf import settings
+
+from . import metrics
+
+
+THRESHOLD_MS = getattr(settings, 'SLOW_QUERY_THRESHOLD_MS', 100)
+SAMPLE_RATE = getattr(settings, 'SLOW_QUERY_SAMPLE_RATE', 0.01)
+LOG_PATH = getattr(
+    settings,
+    'SLOW_QUERY_LOG',
+    os.path.join(settings.BASE_DIR, 'var', 'slow-queries.jsonl'),
+)
+LOG_MAX_BYTES = getattr(settings, 'SLOW_QUERY_LOG_MAX_BYTES', 10 * 2 ** 20)
+STACK_DEPTH = 6
+
+logger = logging.getLogger('posts.slow_queries')
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER = re.compile(r'%s|\?')
+_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_SPACE = re.compile(r'\s+')
+_PROJECT_DIR = str(settings.BASE_DIR)
+
+
+def normalize(sql):
+    """SQL with literals and IN lists masked, so similar queries match."""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _LIST.sub('(...)', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+
+def fingerprint(sql):
+    return hashlib.sha1(normalize(sql).encode()).hexdigest()[:12]
+
+
+def call_site():
+    """Innermost project frames (outside this module), outermost first."""
+    frames = [
+        frame for frame in traceback.extract_stack()[:-2]
+        if frame.filename.startswith(_PROJECT_DIR)
+        and 'site-packages' not in frame.filename
+        and frame.filename != __file__
+    ]
+    return [
+        f'{os.path.relpath(frame.filename, _PROJECT_DIR)}:{frame.lineno} '
+        f'in {frame.name}'
+        for frame in frames[-STACK_DEPTH:]
+    ]
+
+
+def record(sql, duration_ms, view):
+    entry = {
+        'time': datetime.now(timezone.utc).isoformat(),
+        'view': view,
+        'fingerprint': fingerprint(sql),
+        'sql': normalize(sql),
+        'duration_ms': round(duration_ms, 3),
+        'stack': call_site(),
+    }
+    logger.warning(
+        'Slow query %.1f ms in %s [%s]: %s',
+        duration_ms, view, entry['fingerprint'], entry['sql'],
+    )
+    if LOG_PATH:
+        append(LOG_PATH, json.dumps(entry) + '\n')
+    return entry
+
+
+def append(path, line):
+    try:
+        if os.path.getsize(path) >= LOG_MAX_BYTES:
+            # Another worker may rotate at the same time; one wins.
+            os.replace(path, f'{path}.1')
+    except FileNotFoundError:
+        os.makedirs(os.path.dirname(path) or '.', mode=0o700, exist_ok=True)
+    # The SQL may quote user data: readable by the owner only.
+    descriptor = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+    with os.fdopen(descriptor, 'a') as log:
+        log.write(line)
+
+
+class SlowQueryWrapper:
+    def __init__(self, threshold_ms=None):
+        self.threshold_ms = (
+            THRESHOLD_MS if threshold_ms is None else threshold_ms
+        )
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration_ms = (time.perf_counter() - started) * 1000
+            if duration_ms >= self.threshold_ms:
+                record(sql, duration_ms, metrics.current_view())
+
+
+def read(path=None):
+    """Entries of the JSON-lines log and its rotated part, skipping
+    torn lines."""
+    path = path or LOG_PATH
+    for name in (f'{path}.1', path):
+        if name != path and not os.path.exists(name):
+            continue
+        with open(name) as log:
+            for line in log:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+
+def summarize(entries):
+    """Per-fingerprint totals, the most expensive first."""
+    groups = {}
+    for entry in entries:
+        group = groups.setdefault(entry['fingerprint'], {
+            'fingerprint': entry['fingerprint'],
+            'sql': entry['sql'],
+            'count': 0,
+            'total_ms': 0.0,
+            'max_ms': 0.0,
+            'views': {},
+            'stack': entry['stack'],
+        })
+        group['count'] += 1
+        group['total_ms'] += entry['duration_ms']
+        if entry['duration_ms'] >= group['max_ms']:
+            group['max_ms'] = entry['duration_ms']
+            group['stack'] = entry['stack']
+        views = group['views']
+        views[entry['view']] = views.get(entry['view'], 0) + 1
+    return sorted(groups.values(), key=lambda group: -group['total_ms'])
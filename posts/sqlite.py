@@ -0,0 +1,58 @@
+"""SQLite connection tuning profiles.
+
+`settings.SQLITE_PROFILE` picks a set of PRAGMAs applied to every new
+connection through `connection_created`; `settings.SQLITE_PRAGMAS`
+overrides single values. The production profile switches to WAL so
+readers never block the writer and waits on a busy database instead of
+failing with "database is locked".
+"""
+import os
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+
+PROFILES = {
+    'default': {},
+    'production': {
+        'journal_mode': 'wal',
+        'synchronous': 'normal',
+        'busy_timeout': 5000,
+        'cache_size': -65536,
+        'mmap_size': 268435456,
+        'temp_store': 'memory',
+    },
+}
+
+
+def check_profile():
+    """Fail at startup, not on every connection, on an unknown profile."""
+    if settings.SQLITE_PROFILE not in PROFILES:
+        raise ImproperlyConfigured(
+            f'Unknown SQLITE_PROFILE {settings.SQLITE_PROFILE!r}; '
+            f'expected one of {", ".join(sorted(PROFILES))}.'
+        )
+
+
+def pragmas(profile=None):
+    values = dict(PROFILES[profile or settings.SQLITE_PROFILE])
+    if profile is None:
+        values.update(getattr(settings, 'SQLITE_PRAGMAS', {}))
+    return values
+
+
+def apply_pragmas(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in pragmas().items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def wal_size(connection):
+    """Size in bytes of the database's write-ahead log, 0 if none."""
+    path = f"{connection.settings_dict['NAME']}-wal"
+    try:
+        return os.path.getsize(path)
+    except (OSError, TypeError):
+        return 0
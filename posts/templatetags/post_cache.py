@@ -0,0 +1,73 @@
+from django import template
+from django.core.cache import InvalidCacheBackendError, caches
+from django.core.cache.utils import make_template_fragment_key
+from django.template import TemplateSyntaxError, VariableDoesNotExist
+from django.templatetags.cache import CacheNode, do_cache
+
+from posts import cache as page_cache
+from posts import metrics
+
+
+register = template.Library()
+
+
+class SingleFlightCacheNode(CacheNode):
+    """`CacheNode` stored through `posts.cache.get_or_build`.
+
+    An expired fragment is rebuilt by one render at a time while the
+    others reuse the stale markup, and every lookup is reported to
+    posts.metrics.
+    """
+
+    def resolve(self, variable, context):
+        try:
+            return variable.resolve(context)
+        except VariableDoesNotExist:
+            raise TemplateSyntaxError(
+                '"cache" tag got an unknown variable: %r' % variable.var
+            )
+
+    def backend(self, context):
+        if not self.cache_name:
+            try:
+                return caches['template_fragments']
+            except InvalidCacheBackendError:
+                return caches['default']
+        cache_name = self.resolve(self.cache_name, context)
+        try:
+            return caches[cache_name]
+        except InvalidCacheBackendError:
+            raise TemplateSyntaxError(
+                'Invalid cache name specified for cache tag: %r' % cache_name
+            )
+
+    def render(self, context):
+        expire_time = self.resolve(self.expire_time_var, context)
+        if expire_time is not None:
+            try:
+                expire_time = int(expire_time)
+            except (ValueError, TypeError):
+                raise TemplateSyntaxError(
+                    '"cache" tag got a non-integer timeout value: %r'
+                    % expire_time
+                )
+        key = make_template_fragment_key(
+            self.fragment_name,
+            [var.resolve(context) for var in self.vary_on],
+        )
+        value, result = page_cache.get_or_build(
+            key, expire_time, lambda: self.nodelist.render(context),
+            self.backend(context),
+        )
+        metrics.cache_lookup('fragment', result)
+        return value
+
+
+@register.tag('cache')
+def do_single_flight_cache(parser, token):
+    """`{% cache %}` with single-flight rebuilds and metrics."""
+    node = do_cache(parser, token)
+    return SingleFlightCacheNode(
+        node.nodelist, node.expire_time_var, node.fragment_name,
+        node.vary_on, node.cache_name,
+    )
@@ -0,0 +1,26 @@
+from django import template
+from django.db import transaction
+
+from posts import thumbnails
+
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def feed_thumbnail(context, image):
+    """Ready feed thumbnail of `image`; None, and queued, while it is built.
+
+    Feed views resolve a whole page at once into `thumbnail_map`; other
+    pages fall back to a single KV store lookup.
+    """
+    if not image:
+        return None
+    prefetched = context.get('thumbnail_map') or {}
+    if image.name in prefetched:
+        ready = prefetched[image.name]
+    else:
+        ready = thumbnails.ready_thumbnail(image)
+    if ready is None:
+        transaction.on_commit(lambda: thumbnails.schedule(image))
+    return ready
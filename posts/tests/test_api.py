@@ -0,0 +1,75 @@
+from django.test import TestCase
+from django.urls import reverse
+
+from posts.models import Group, Post, User
+from posts.paginator import PAGE_SIZE
+
+
+class FeedApiTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='Mobile')
+        cls.group = Group.objects.create(
+            title='Api group', slug='api', description='Feeds over JSON',
+        )
+        for number in range(PAGE_SIZE + 3):
+            Post.objects.create(
+                text=f'Post {number}', author=cls.user, group=cls.group,
+            )
+
+    def test_feeds_are_paginated_json(self):
+        for url in (
+            reverse('api_index'),
+            reverse('api_group', args=[self.group.slug]),
+            reverse('api_profile', args=[self.user.username]),
+        ):
+            with self.subTest(url=url):
+                first = self.client.get(url).json()
+                self.assertEqual(len(first['results']), PAGE_SIZE)
+                self.assertEqual(first['results'][0]['text'], 'Post 12')
+                self.assertEqual(first['results'][0]['author'], 'Mobile')
+                self.assertEqual(first['results'][0]['group'], 'api')
+                self.assertIsNone(first['previous'])
+                second = self.client.get(first['next']).json()
+                self.assertEqual(
+                    [post['text'] for post in second['results']],
+                    ['Post 2', 'Post 1', 'Post 0'],
+                )
+                self.assertIsNone(second['next'])
+
+    def test_unknown_feed_is_not_found(self):
+        response = self.client.get(reverse('api_group', args=['missing']))
+        self.assertEqual(response.status_code, 404)
+
+    def test_up_to_date_client_gets_not_modified(self):
+        url = reverse('api_index')
+        response = self.client.get(url)
+        self.assertTrue(response['ETag'].startswith('"'))
+        with self.assertNumQueries(1):
+            cached = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached.content, b'')
+
+    def test_deletion_is_not_hidden_by_a_date(self):
+        url = reverse('api_index')
+        response = self.client.get(url)
+        self.assertNotIn('Last-Modified', response)
+        Post.objects.filter(text='Post 12').delete()
+        after = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT',
+        )
+        self.assertEqual(after.status_code, 200)
+        self.assertEqual(after.json()['results'][0]['text'], 'Post 11')
+
+    def test_changes_change_the_etag(self):
+        url = reverse('api_index')
+        before = self.client.get(url)['ETag']
+        Group.objects.filter(pk=self.group.pk).update(slug='renamed')
+        after = self.client.get(url, HTTP_IF_NONE_MATCH=before)
+        self.assertEqual(after.status_code, 200)
+        self.assertNotEqual(after['ETag'], before)
+        self.assertEqual(after.json()['results'][0]['group'], 'renamed')
+
+    def test_read_only(self):
+        response = self.client.post(reverse('api_index'))
+        self.assertEqual(response.status_code, 405)
@@ -0,0 +1,73 @@
+from django.core.cache import cache
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.signals import request_finished, request_started
+from django.db import close_old_connections
+from django.test import TestCase
+
+from posts import benchmark
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class ViewBenchmarkTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        author = User.objects.create_user(username='Benched')
+        reader = User.objects.create_user(username='Bencher')
+        User.objects.create_user(username='Bystander')
+        group = Group.objects.create(
+            title='Benchmarks', slug='bench', description='Timed',
+        )
+        Follow.objects.create(user=reader, author=author)
+        for number in range(12):
+            Post.objects.create(
+                text=f'Замер {number}', author=author, group=group,
+            )
+
+    def setUp(self):
+        # Like the test client: keep the test transaction's connection.
+        request_started.disconnect(close_old_connections)
+        request_finished.disconnect(close_old_connections)
+
+    def tearDown(self):
+        request_started.connect(close_old_connections)
+        request_finished.connect(close_old_connections)
+
+    def test_every_route_has_a_case(self):
+        names = {case.name for case in benchmark.cases()}
+        self.assertEqual(benchmark.route_names() - names, set())
+
+    def test_run_measures_every_case(self):
+        results = benchmark.run(WSGIHandler(), requests=2, warmup=0)
+        self.assertEqual(
+            set(results), {case.key for case in benchmark.cases()},
+        )
+        self.assertEqual(results['index:anon']['status'], 200)
+        self.assertGreater(results['post:anon']['bytes'], 0)
+        self.assertEqual(results['add_comment:user']['status'], 302)
+        self.assertEqual(results['metrics:scraper']['status'], 200)
+        self.assertFalse(
+            Comment.objects.filter(text=benchmark.BENCH_COMMENT).exists()
+        )
+        self.assertEqual(benchmark.compare(results, results), [])
+
+    def test_cold_run_leaves_the_shared_cache_alone(self):
+        cache.set('live', 'kept')
+        benchmark.run(WSGIHandler(), requests=1, warmup=0, cold=True,
+                      only=['index'])
+        self.assertEqual(cache.get('live'), 'kept')
+
+    def test_compare_flags_regressions(self):
+        before = {'post:anon': {
+            'p50': 5.0, 'p95': 8.0, 'p99': 9.0,
+            'queries': 2, 'bytes': 1000, 'status': 200,
+        }}
+        after = {'post:anon': {
+            **before['post:anon'], 'p50': 9.0, 'queries': 3,
+        }}
+        problems = benchmark.compare(before, after)
+        self.assertEqual(len(problems), 2)
+        self.assertIn('p50', problems[0])
+        self.assertIn('queries', problems[1])
+        slightly_slower = {'post:anon': {**before['post:anon'], 'p50': 5.5}}
+        self.assertEqual(benchmark.compare(before, slightly_slower), [])
@@ -1,36 +1,281 @@
+import time
+from unittest import mock
+
 from django.core.cache import cache
 from django.test import TransactionTestCase, Client
 from django.urls import reverse
 from django.core.cache.utils import make_template_fragment_key
 from django.core.files.uploadedfile import SimpleUploadedFile
 
-from posts.models import Post, Group, User
+from posts import cache as page_cache
+from posts.models import Comment, Follow, Post, Group, User
 
 
 class TestIndex_Cache(TransactionTestCase):
-    @classmethod
-    def setUpClass(cls):
-        super().setUpClass()
-        cls.user = User.objects.create_user(username='TestUser')
-        cls.key = make_template_fragment_key('index_page')
-        cls.authorized_client = Client()
-        cls.authorized_client.force_login(cls.user)
-        cls.group = Group.objects.create(
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='TestUser')
+        self.key = make_template_fragment_key('index_page')
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.group = Group.objects.create(
             title='Title group',
             slug='Test_group',
             description='group for tests'
         )
-        cls.post = Post.objects.create(
+        self.post = Post.objects.create(
             text='TextText', 
-            author=cls.user,
-            group=cls.group
+            author=self.user,
+            group=self.group
         )
 
     def test_cache(self):
         first = self.authorized_client.get(reverse('index'))
-        Post.objects.create(text='Cache check', author=self.user)
+        Post.objects.filter(pk=self.post.pk).update(text='Silent edit')
         second = self.authorized_client.get(reverse('index'))
         cache.clear()
         third = self.authorized_client.get(reverse('index'))
         self.assertEqual(first.content, second.content)
         self.assertNotEqual(second.content, third.content)
+
+    def test_logged_in_page_is_not_served_to_others(self):
+        self.authorized_client.get(reverse('index'))
+        response = self.client.get(reverse('index'))
+        self.assertNotContains(response, f'Пользователь: {self.user}')
+        self.assertIn('Cookie', response['Vary'])
+
+    def test_new_post_refreshes_index(self):
+        first = self.authorized_client.get(reverse('index'))
+        Post.objects.create(text='Cache check', author=self.user)
+        second = self.authorized_client.get(reverse('index'))
+        self.assertNotEqual(first.content, second.content)
+        self.assertContains(second, 'Cache check')
+
+    def test_content_events_bump_generation(self):
+        events = (
+            lambda: Comment.objects.create(
+                post=self.post, author=self.user, text='Комментарий'),
+            lambda: self.group.save(),
+            lambda: self.post.delete(),
+        )
+        for event in events:
+            with self.subTest(event=event):
+                before = page_cache.generation('index_page')
+                event()
+                self.assertGreater(
+                    page_cache.generation('index_page'), before
+                )
+
+    def test_lost_generation_does_not_reuse_keys(self):
+        before = page_cache.generation('index_page')
+        cache.clear()
+        self.assertNotEqual(page_cache.generation('index_page'), before)
+
+
+class TestPostFragment_Cache(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='FragmentUser')
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.post = Post.objects.create(text='Fragment', author=self.user)
+        self.url = reverse('profile', kwargs={'username': self.user})
+
+    def test_card_is_cached_until_post_changes(self):
+        self.client.get(self.url)
+        Post.objects.filter(pk=self.post.pk).update(text='Silent edit')
+        self.assertContains(self.client.get(self.url), 'Fragment')
+        self.post.text = 'Saved edit'
+        self.post.save()
+        self.assertContains(self.client.get(self.url), 'Saved edit')
+
+    def test_edit_button_stays_per_viewer(self):
+        response = self.authorized_client.get(self.url)
+        self.assertContains(response, 'Редактировать')
+        response = self.client.get(self.url)
+        self.assertContains(response, 'Fragment')
+        self.assertNotContains(response, 'Редактировать')
+
+
+class TestStampede(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='StampedeUser')
+        self.post = Post.objects.create(text='First post', author=self.user)
+
+    def test_stale_page_is_served_while_another_rebuilds(self):
+        self.client.get(reverse('index'))
+        Post.objects.create(text='Second post', author=self.user)
+        with mock.patch.object(page_cache, 'lock', return_value=False):
+            stale = self.client.get(reverse('index'))
+        self.assertContains(stale, 'First post')
+        self.assertNotContains(stale, 'Second post')
+        self.assertContains(self.client.get(reverse('index')), 'Second post')
+
+    def test_logged_in_page_is_never_served_stale(self):
+        client = Client()
+        client.force_login(self.user)
+        client.get(reverse('index'))
+        Post.objects.create(text='Second post', author=self.user)
+        with mock.patch.object(page_cache, 'lock', return_value=False):
+            response = self.client.get(reverse('index'))
+        self.assertNotContains(response, f'Пользователь: {self.user}')
+        self.assertContains(response, 'Second post')
+
+    def test_page_without_stale_copy_is_built(self):
+        with mock.patch.object(page_cache, 'lock', return_value=False):
+            response = self.client.get(reverse('index'))
+        self.assertContains(response, 'First post')
+
+    def test_lock_is_released_after_rebuild(self):
+        with mock.patch.object(
+            page_cache, 'unlock', wraps=page_cache.unlock,
+        ) as unlock:
+            self.client.get(reverse('index'))
+        self.assertTrue(unlock.called)
+        self.assertTrue(page_cache.lock(unlock.call_args[0][0]))
+
+    def test_expired_fragment_is_rebuilt_once(self):
+        build = mock.Mock(side_effect=['old', 'new'])
+        self.assertEqual(
+            page_cache.get_or_build('fragment', 60, build), ('old', 'miss'),
+        )
+        self.assertEqual(
+            page_cache.get_or_build('fragment', 60, build), ('old', 'hit'),
+        )
+        later = time.time() + 61
+        with mock.patch('time.time', return_value=later):
+            page_cache.lock('fragment')
+            self.assertEqual(
+                page_cache.get_or_build('fragment', 60, build),
+                ('old', 'stale'),
+            )
+            page_cache.unlock('fragment')
+            self.assertEqual(
+                page_cache.get_or_build('fragment', 60, build),
+                ('new', 'miss'),
+            )
+        self.assertEqual(build.call_count, 2)
+
+    def test_early_refresh(self):
+        build = mock.Mock(side_effect=['old', 'new'])
+        page_cache.get_or_build('fragment', 60, build)
+        with mock.patch.object(page_cache, 'EARLY_REFRESH', 0):
+            self.assertEqual(
+                page_cache.get_or_build('fragment', 60, build),
+                ('old', 'hit'),
+            )
+        with mock.patch.object(page_cache, 'EARLY_REFRESH', 10 ** 9):
+            self.assertEqual(
+                page_cache.get_or_build('fragment', 60, build),
+                ('new', 'miss'),
+            )
+
+
+class TestPublicPageCache(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(
+            username='Public', first_name='Cached',
+        )
+        self.reader = User.objects.create_user(username='Member')
+        self.group = Group.objects.create(
+            title='Public group', slug='public', description='Cached',
+        )
+        self.other_group = Group.objects.create(
+            title='Other group', slug='other', description='Untouched',
+        )
+        self.post = Post.objects.create(
+            text='Tagged post', author=self.author, group=self.group,
+        )
+        self.urls = {
+            'group': reverse('group', args=[self.group.slug]),
+            'profile': reverse('profile', args=[self.author.username]),
+            'post': reverse('post', args=[self.author.username, self.post.pk]),
+        }
+
+    def silent_edit(self):
+        # Queryset updates send no signals; the post card fragment keys
+        # on the post itself, so edit what only the pages show.
+        User.objects.filter(pk=self.author.pk).update(first_name='Silent')
+        Group.objects.filter(pk=self.group.pk).update(description='Silent')
+
+    def assertCached(self, *names):
+        for name in names:
+            response = self.client.get(self.urls[name])
+            self.assertContains(response, 'Cached')
+            self.assertNotContains(response, 'Silent')
+
+    def assertPurged(self, *names):
+        for name in names:
+            self.assertContains(self.client.get(self.urls[name]), 'Silent')
+
+    def test_anonymous_pages_are_cached_and_tagged(self):
+        for name, url in self.urls.items():
+            response = self.client.get(url)
+            self.assertIn(f'post:{self.post.pk}', response['Surrogate-Key'])
+            with self.subTest(page=name), self.assertNumQueries(0):
+                self.client.get(url)
+
+    def test_logged_in_pages_are_not_cached(self):
+        client = Client()
+        client.force_login(self.reader)
+        self.assertCached('post')
+        client.get(self.urls['post'])
+        self.silent_edit()
+        self.assertContains(client.get(self.urls['post']), 'Silent')
+        self.assertCached('post')
+
+    def test_comment_purges_pages_showing_the_post(self):
+        self.assertCached(*self.urls)
+        self.silent_edit()
+        Comment.objects.create(post=self.post, author=self.reader, text='!')
+        self.assertPurged(*self.urls)
+
+    def test_follow_purges_only_the_profiles(self):
+        self.assertCached(*self.urls)
+        self.silent_edit()
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertPurged('profile', 'post')
+        self.assertCached('group')
+
+    def test_new_post_elsewhere_keeps_the_group_page(self):
+        self.assertCached(*self.urls)
+        self.silent_edit()
+        Post.objects.create(
+            text='Elsewhere', author=self.reader, group=self.other_group,
+        )
+        self.assertCached(*self.urls)
+
+    def test_group_edit_purges_cards(self):
+        self.assertCached(*self.urls)
+        self.silent_edit()
+        self.group.title = 'Renamed group'
+        self.group.save()
+        self.assertPurged(*self.urls)
+
+    def test_rename_purges_the_author_cards(self):
+        self.assertCached('group')
+        self.author.username = 'Renamed'
+        self.author.save()
+        self.assertContains(self.client.get(self.urls['group']), '@Renamed')
+
+    def test_rename_purges_the_commenters_pages(self):
+        Comment.objects.create(post=self.post, author=self.reader, text='!')
+        self.assertContains(self.client.get(self.urls['post']), '@Member')
+        self.reader.username = 'Renamed'
+        self.reader.save()
+        self.assertContains(self.client.get(self.urls['post']), '@Renamed')
+
+    def test_lost_purge_stamp_is_not_trusted(self):
+        self.assertCached('post')
+        self.silent_edit()
+        cache.delete(f'purged:post:{self.post.pk}')
+        self.assertPurged('post')
+
+    def test_deleted_author_purges_the_profile(self):
+        lurker = User.objects.create_user(username='Lurker')
+        url = reverse('profile', args=[lurker.username])
+        self.assertEqual(self.client.get(url).status_code, 200)
+        lurker.delete()
+        self.assertEqual(self.client.get(url).status_code, 404)
@@ -0,0 +1,91 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
+from django.test import SimpleTestCase
+
+from posts.cache_backend import SQLiteCache
+
+
+class SQLiteCacheTest(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.path = os.path.join(directory, 'cache.sqlite3')
+        self.cache = self.make_cache()
+
+    def make_cache(self, **options):
+        return SQLiteCache(self.path, {'OPTIONS': options})
+
+    def test_basic_operations(self):
+        cache = self.cache
+        cache.set('page', {'html': 'текст'})
+        self.assertEqual(cache.get('page'), {'html': 'текст'})
+        self.assertFalse(cache.add('page', 'other'))
+        self.assertTrue(cache.add('counter', 1, None))
+        self.assertEqual(cache.incr('counter', 2), 3)
+        with self.assertRaises(ValueError):
+            cache.incr('missing')
+        cache.set_many({'a': 1, 'b': 2})
+        self.assertEqual(cache.get_many(['a', 'b', 'c']), {'a': 1, 'b': 2})
+        cache.delete_many(['a', 'b'])
+        self.assertIsNone(cache.get('a'))
+        self.assertTrue(cache.has_key('page'))
+        cache.clear()
+        self.assertFalse(cache.has_key('page'))
+
+    def test_file_is_private(self):
+        self.cache.set('page', 'html')
+        self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o600)
+
+    def test_readable_file_is_made_private(self):
+        open(self.path, 'w').close()
+        os.chmod(self.path, 0o644)
+        self.make_cache().set('page', 'html')
+        self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o600)
+
+    def test_expired_entries_are_misses(self):
+        self.cache.set('short', 'value', 1)
+        self.cache.set('gone', 'value', 0)
+        self.assertIsNone(self.cache.get('gone'))
+        self.assertTrue(self.cache.add('gone', 'again'))
+        time.sleep(1.1)
+        self.assertIsNone(self.cache.get('short'))
+
+    def test_least_recently_used_are_evicted(self):
+        cache = self.make_cache(
+            MAX_ENTRIES=4, CULL_EVERY=1, ACCESS_RESOLUTION=0,
+        )
+        for key in 'abcd':
+            cache.set(key, key)
+        cache.get('a')
+        cache.set('e', 'e')
+        self.assertEqual(cache.get('a'), 'a')
+        self.assertIsNone(cache.get('b'))
+
+    def test_size_cap(self):
+        cache = self.make_cache(MAX_BYTES=10000, CULL_EVERY=1)
+        for number in range(10):
+            cache.set(f'page{number}', 'x' * 2000)
+        self.assertLessEqual(len(cache.get_many(
+            [f'page{number}' for number in range(10)]
+        )), 5)
+
+    def test_shared_between_processes(self):
+        self.cache.set('counter', 0, None)
+        context = multiprocessing.get_context('fork')
+        processes = [
+            context.Process(target=self.increment) for _ in range(4)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        self.assertEqual(self.cache.get('counter'), 200)
+
+    def increment(self):
+        cache = self.make_cache()
+        for _ in range(50):
+            cache.incr('counter')
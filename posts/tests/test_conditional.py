@@ -0,0 +1,119 @@
+from django.core.cache import cache
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='Cached')
+        cls.reader = User.objects.create_user(username='Returning')
+        cls.group = Group.objects.create(
+            title='Conditional', slug='conditional', description='304s',
+        )
+        cls.other_group = Group.objects.create(
+            title='Other', slug='other', description='Elsewhere',
+        )
+        cls.post = Post.objects.create(
+            text='Unchanged', author=cls.author, group=cls.group,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.urls = {
+            'group': reverse('group', args=[self.group.slug]),
+            'profile': reverse('profile', args=[self.author.username]),
+            'post': reverse('post', args=[self.author.username, self.post.pk]),
+        }
+
+    def etags(self, client=None):
+        client = client or self.client
+        return {
+            name: client.get(url)['ETag'] for name, url in self.urls.items()
+        }
+
+    def assertNotModified(self, name, tag, client=None):
+        client = client or self.client
+        response = client.get(self.urls[name], HTTP_IF_NONE_MATCH=tag)
+        self.assertEqual(response.status_code, 304, name)
+
+    def assertModified(self, name, tag):
+        response = self.client.get(self.urls[name], HTTP_IF_NONE_MATCH=tag)
+        self.assertEqual(response.status_code, 200, name)
+
+    def test_unchanged_pages_skip_the_view(self):
+        for name, tag in self.etags().items():
+            with self.subTest(page=name), self.assertNumQueries(0):
+                self.assertNotModified(name, tag)
+
+    def test_pages_differ_per_viewer(self):
+        client = Client()
+        client.force_login(self.reader)
+        anonymous, logged_in = self.etags(), self.etags(client)
+        for name in self.urls:
+            self.assertNotEqual(anonymous[name], logged_in[name])
+            self.assertNotModified(name, logged_in[name], client)
+
+    def test_new_csrf_secret_changes_the_tag(self):
+        client = Client()
+        client.force_login(self.reader)
+        tag = client.get(self.urls['post'])['ETag']
+        self.assertNotModified('post', tag, client)
+        # As after logging out and in again: login rotates the secret.
+        client.cookies['csrftoken'] = 'x' * 64
+        response = client.get(self.urls['post'], HTTP_IF_NONE_MATCH=tag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_comment_changes_post_profile_and_group(self):
+        tags = self.etags()
+        Comment.objects.create(post=self.post, author=self.reader, text='Hi')
+        for name, tag in tags.items():
+            self.assertModified(name, tag)
+
+    def test_moving_a_post_changes_both_groups(self):
+        other = reverse('group', args=[self.other_group.slug])
+        before, other_before = self.etags(), self.client.get(other)['ETag']
+        self.post.group = self.other_group
+        self.post.save()
+        self.assertModified('group', before['group'])
+        response = self.client.get(other, HTTP_IF_NONE_MATCH=other_before)
+        self.assertEqual(response.status_code, 200)
+
+    def test_follow_changes_both_profiles(self):
+        tags = self.etags()
+        reader_url = reverse('profile', args=[self.reader.username])
+        reader_tag = self.client.get(reader_url)['ETag']
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertModified('profile', tags['profile'])
+        self.assertModified('post', tags['post'])
+        self.assertNotModified('group', tags['group'])
+        response = self.client.get(reader_url, HTTP_IF_NONE_MATCH=reader_tag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_rename_changes_the_author_pages(self):
+        tags = self.etags()
+        author = User.objects.get(pk=self.author.pk)
+        author.username = 'Renamed'
+        author.save()
+        self.assertModified('group', tags['group'])
+        response = self.client.get(
+            self.urls['profile'], HTTP_IF_NONE_MATCH=tags['profile'],
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_commenter_rename_changes_the_post_page(self):
+        Comment.objects.create(post=self.post, author=self.reader, text='Hi')
+        tag = self.client.get(self.urls['post'])['ETag']
+        reader = User.objects.get(pk=self.reader.pk)
+        reader.username = 'Renamed'
+        reader.save()
+        self.assertModified('post', tag)
+
+    def test_group_edit_changes_every_page(self):
+        tags = self.etags()
+        self.other_group.title = 'Renamed'
+        self.other_group.save()
+        for name, tag in tags.items():
+            self.assertModified(name, tag)
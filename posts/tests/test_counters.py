@@ -0,0 +1,70 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Post, User, UserStats
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Counter')
+        cls.author = User.objects.create_user(username='Counted')
+        cls.authorized_client = Client()
+        cls.authorized_client.force_login(cls.user)
+        cls.post = Post.objects.create(text='Counted post', author=cls.author)
+
+    def stats(self, user):
+        return UserStats.objects.for_user(
+            User.objects.select_related('stats').get(pk=user.pk)
+        )
+
+    def test_comment_count_follows_writes(self):
+        self.authorized_client.post(
+            reverse('add_comment', args=[self.author.username, self.post.pk]),
+            {'text': 'Первый'},
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+        Comment.objects.filter(post=self.post).delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 0)
+
+    def test_follow_and_post_counters(self):
+        self.authorized_client.get(
+            reverse('profile_follow', args=[self.author.username])
+        )
+        self.assertEqual(self.stats(self.author).followers, 1)
+        self.assertEqual(self.stats(self.author).posts, 1)
+        self.assertEqual(self.stats(self.user).following, 1)
+        self.authorized_client.get(
+            reverse('profile_unfollow', args=[self.author.username])
+        )
+        self.assertEqual(self.stats(self.author).followers, 0)
+        self.assertEqual(self.stats(self.user).following, 0)
+
+    def test_recount_repairs_drift(self):
+        Follow.objects.create(user=self.user, author=self.author)
+        UserStats.objects.filter(user=self.author).update(
+            followers=7, posts=0,
+        )
+        Post.objects.filter(pk=self.post.pk).update(comment_count=3)
+        out = StringIO()
+        call_command('recount_stats', stdout=out)
+        self.assertIn('stats.followers: 1 row(s) repaired', out.getvalue())
+        self.assertEqual(self.stats(self.author).followers, 1)
+        self.assertEqual(self.stats(self.author).posts, 1)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 0)
+
+    def test_profile_card_does_not_count_rows(self):
+        url = reverse('profile', args=[self.author.username])
+        self.client.get(url)
+        cache.clear()
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertContains(response, 'Записей: 1')
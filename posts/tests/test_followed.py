@@ -0,0 +1,55 @@
+from django.core.cache import cache
+from django.test import TestCase, Client
+from django.contrib.auth.models import AnonymousUser
+from django.urls import reverse
+
+from posts import followed
+from posts.models import Follow, User
+
+
+class FollowedAuthorsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='Viewer')
+        cls.author = User.objects.create_user(username='Followed')
+        cls.other = User.objects.create_user(username='Someone')
+
+    def setUp(self):
+        cache.clear()
+        self.client_reader = Client()
+        self.client_reader.force_login(self.reader)
+
+    def test_profile_checks_the_viewer(self):
+        Follow.objects.create(user=self.other, author=self.author)
+        url = reverse('profile', args=[self.author.username])
+        response = self.client_reader.get(url)
+        self.assertNotIn(self.author.pk, response.context['followed_ids'])
+        self.assertContains(response, 'Подписаться')
+        self.assertNotContains(response, 'Отписаться')
+
+    def test_set_is_loaded_once(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        with self.assertNumQueries(1):
+            followed.author_ids(self.reader)
+        with self.assertNumQueries(0):
+            self.assertTrue(followed.is_following(self.reader, self.author))
+            self.assertFalse(followed.is_following(self.reader, self.other))
+
+    def test_follow_and_unfollow_update_the_set(self):
+        self.assertEqual(followed.author_ids(self.reader), frozenset())
+        self.client_reader.get(
+            reverse('profile_follow', args=[self.author.username])
+        )
+        self.assertEqual(
+            followed.author_ids(self.reader), {self.author.pk},
+        )
+        self.client_reader.get(
+            reverse('profile_unfollow', args=[self.author.username])
+        )
+        self.assertEqual(followed.author_ids(self.reader), frozenset())
+
+    def test_anonymous_follows_nobody(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                followed.author_ids(AnonymousUser()), frozenset(),
+            )
@@ -0,0 +1,130 @@
+import json
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import metrics
+from posts.models import Post, User
+
+
+@override_settings(METRICS_TOKEN='scraper-secret')
+class MetricsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Measured')
+        Post.objects.create(text='Измеряемый пост', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        patcher = mock.patch.object(metrics.registry, 'directory', directory)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        metrics.registry.clear()
+        self.directory = directory
+
+    def scrape(self):
+        response = self.client.get(
+            reverse('metrics'), HTTP_AUTHORIZATION='Bearer scraper-secret',
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode()
+
+    def test_only_staff_and_scrapers_may_read(self):
+        url = reverse('metrics')
+        self.assertEqual(self.client.get(url).status_code, 403)
+        response = self.client.get(url, HTTP_AUTHORIZATION='Bearer guess')
+        self.assertEqual(response.status_code, 403)
+        client = Client()
+        client.force_login(self.user)
+        self.assertEqual(client.get(url).status_code, 403)
+        staff = User.objects.create_user(username='Operator', is_staff=True)
+        client.force_login(staff)
+        self.assertEqual(client.get(url).status_code, 200)
+        with override_settings(METRICS_TOKEN=''):
+            response = self.client.get(url, HTTP_AUTHORIZATION='Bearer ')
+        self.assertEqual(response.status_code, 403)
+
+    def test_requests_are_labelled_by_url_name(self):
+        self.client.get(reverse('profile', args=[self.user.username]))
+        body = self.scrape()
+        self.assertIn(
+            'yatube_request_duration_seconds_count{view="profile"} 1', body,
+        )
+        self.assertIn(
+            'yatube_responses_total{status="200",view="profile"} 1', body,
+        )
+        self.assertIn(
+            'yatube_template_render_seconds_count{view="profile"} 1', body,
+        )
+        self.assertIn('yatube_db_queries_total{view="profile"} 2', body)
+
+    def test_page_and_fragment_cache_lookups(self):
+        self.client.get(reverse('index'))
+        self.client.get(reverse('index'))
+        self.client.get(reverse('profile', args=[self.user.username]))
+        body = self.scrape()
+        for cache_name, view, result in (
+            ('page', 'index', 'miss'),
+            ('page', 'index', 'hit'),
+            ('fragment', 'index', 'miss'),
+            ('fragment', 'profile', 'hit'),
+        ):
+            self.assertIn(
+                'yatube_cache_requests_total{cache="%s",result="%s",'
+                'view="%s"} 1' % (cache_name, result, view),
+                body,
+            )
+
+    def test_other_processes_are_summed(self):
+        self.client.get(reverse('index'))
+        metrics.registry.flush()
+        with open(metrics.registry.path()) as stream:
+            snapshot = json.load(stream)
+        with open(os.path.join(self.directory, '1.json'), 'w') as stream:
+            json.dump(snapshot, stream)
+        body = self.scrape()
+        self.assertIn(
+            'yatube_request_duration_seconds_count{view="index"} 2', body,
+        )
+        self.assertIn(
+            'yatube_request_duration_seconds_bucket{view="index",le="+Inf"} 2',
+            body,
+        )
+
+    def test_malformed_files_are_skipped(self):
+        self.client.get(reverse('index'))
+        for number, content in enumerate((
+            '[]',
+            '{"counters": []}',
+            '{"counters": [["yatube_db_queries_total", [], "1"]],'
+            ' "histograms": []}',
+            '{"counters": [], "histograms": [["x", [], [1]]]}',
+            '{"counters": {"a": 1}, "histograms": []}',
+        ), start=1):
+            path = os.path.join(self.directory, f'{number}.json')
+            with open(path, 'w') as stream:
+                stream.write(content)
+        self.assertIn(
+            'yatube_request_duration_seconds_count{view="index"} 1',
+            self.scrape(),
+        )
+
+    def test_only_server_processes_share_their_metrics(self):
+        self.client.get(reverse('index'))
+        self.assertEqual(os.listdir(self.directory), [])
+        with mock.patch.object(metrics.registry, 'serving', True), \
+                mock.patch.object(metrics, 'FLUSH_INTERVAL', 0):
+            self.client.get(reverse('index'))
+        self.assertEqual(os.listdir(self.directory), [
+            os.path.basename(metrics.registry.path()),
+        ])
+        mode = os.stat(metrics.registry.path()).st_mode
+        self.assertEqual(mode & 0o077, 0)
@@ -0,0 +1,59 @@
+from django.core.cache import cache
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from posts.models import Post, User
+from posts.paginator import CursorPaginator, decode_cursor
+
+
+class CursorPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Paginated')
+        cls.client_guest = Client()
+        Post.objects.bulk_create(
+            Post(text=f'Post {number}', author=cls.user)
+            for number in range(25)
+        )
+        cls.ordered = list(Post.objects.order_by('-pub_date', '-pk'))
+
+    def setUp(self):
+        cache.clear()
+
+    def get_profile(self, **params):
+        return self.client_guest.get(
+            reverse('profile', args=[self.user.username]), params
+        )
+
+    def test_walks_forward_and_back_with_tokens(self):
+        first = self.get_profile()
+        self.assertEqual(list(first.context['page']), self.ordered[:10])
+        cursor = first.context['cursor']
+        self.assertFalse(cursor.has_previous)
+
+        second = self.get_profile(after=cursor.next_token)
+        self.assertEqual(list(second.context['page']), self.ordered[10:20])
+        self.assertEqual(second.context['cursor'].number, 2)
+
+        third = self.get_profile(after=second.context['cursor'].next_token)
+        self.assertEqual(list(third.context['page']), self.ordered[20:])
+        self.assertFalse(third.context['cursor'].has_next)
+
+        back = self.get_profile(before=third.context['cursor'].previous_token)
+        self.assertEqual(list(back.context['page']), self.ordered[10:20])
+
+    def test_legacy_page_number_still_works(self):
+        response = self.get_profile(page=2)
+        self.assertEqual(list(response.context['page']), self.ordered[10:20])
+        self.assertTrue(response.context['cursor'].has_previous)
+
+    def test_page_does_not_count_rows(self):
+        with self.assertNumQueries(1):
+            rows, cursor = CursorPaginator(Post.objects.all()).get_page({})
+        self.assertEqual(len(rows), 10)
+
+    def test_malformed_token_falls_back_to_first_page(self):
+        self.assertIsNone(decode_cursor('not-a-token'))
+        response = self.get_profile(after='not-a-token')
+        self.assertEqual(list(response.context['page']), self.ordered[:10])
@@ -0,0 +1,56 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts import profiling
+from posts.models import Comment, Post, User
+
+
+class TemplateProfileTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Profiled')
+        cls.post = Post.objects.create(text='Профиль', author=cls.user)
+        Comment.objects.create(post=cls.post, author=cls.user, text='Да')
+
+    def post_url(self):
+        return reverse('post', args=[self.user.username, self.post.pk])
+
+    def rows(self, response):
+        rows = {}
+        for item in response['X-Template-Profile'].split(', '):
+            name, *fields = item.split(';')
+            rows[name] = dict(field.split('=') for field in fields)
+        return rows
+
+    def test_signed_header_profiles_includes(self):
+        response = self.client.get(
+            self.post_url(), HTTP_X_TEMPLATE_PROFILE=profiling.token(),
+        )
+        rows = self.rows(response)
+        for name in (
+            'post.html', 'base.html', 'includes/post_item.html',
+            'includes/comments.html', 'includes/author_post.html',
+        ):
+            self.assertIn(name, rows)
+        page = rows['post.html']
+        self.assertEqual(page['count'], '1')
+        self.assertLess(float(page['self']), float(page['cum']))
+        self.assertIn('Server-Timing', response)
+
+    def test_unsigned_requests_are_not_profiled(self):
+        response = self.client.get(self.post_url())
+        self.assertNotIn('X-Template-Profile', response)
+        response = self.client.get(
+            self.post_url(), HTTP_X_TEMPLATE_PROFILE='forged',
+        )
+        self.assertNotIn('X-Template-Profile', response)
+
+    @override_settings(TEMPLATE_PROFILING=True)
+    def test_setting_profiles_every_request(self):
+        response = self.client.get(
+            reverse('profile', args=[self.user.username])
+        )
+        self.assertEqual(
+            self.rows(response)['includes/post_item.html']['count'], '1',
+        )
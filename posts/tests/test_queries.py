@@ -0,0 +1,161 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from posts import tiered
+from posts.models import Comment, Follow, Group, Post, User
+from posts.urls import urlpatterns
+
+
+# Queries allowed per request by URL name, as (logged in, budget). A
+# logged-in budget includes loading the session and the user. Budgets
+# must hold no matter how many posts, comments or follows a page shows.
+# URLs in AS_AUTHOR are requested by the author of the post they name.
+# Writes are budgeted on requests that make them: URLs in WRITES are
+# posted valid forms, and follows go to an author not followed yet.
+QUERY_BUDGETS = {
+    'index': (False, 1),
+    'group': (False, 2),
+    'search': (False, 2),
+    'metrics': (False, 0),
+    'api_index': (False, 1),
+    'api_group': (False, 2),
+    'api_profile': (False, 2),
+    'new_post': (True, 13),
+    'follow_index': (True, 4),
+    'profile_follow': (True, 15),
+    'profile_unfollow': (True, 12),
+    'profile': (False, 2),
+    'post': (False, 2),
+    'post_comments': (False, 2),
+    'post_edit': (True, 4),
+    'add_comment': (True, 8),
+    '404_error': (False, 1),
+    '500_error': (False, 1),
+}
+AS_AUTHOR = {'post_edit'}
+WRITES = {'new_post', 'add_comment', 'profile_follow', 'profile_unfollow'}
+
+
+class QueryBudgetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Budget')
+        cls.author = User.objects.create_user(username='Spender')
+        cls.stranger = User.objects.create_user(username='Stranger')
+        cls.group = Group.objects.create(
+            title='Budget group',
+            slug='budget',
+            description='Many posts',
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+        # New posts of the user fan out; a new follow has posts to copy.
+        Follow.objects.create(user=cls.author, author=cls.user)
+        Follow.objects.create(user=cls.author, author=cls.stranger)
+        for number in range(3):
+            Post.objects.create(text=f'Stranger {number}', author=cls.stranger)
+        for number in range(15):
+            post = Post.objects.create(
+                text=f'Post {number}',
+                author=cls.author if number % 2 else cls.user,
+                group=cls.group,
+            )
+            Comment.objects.create(post=post, author=cls.author, text='Hi')
+        cls.post = Post.objects.filter(author=cls.author).first()
+        cls.authorized_client = Client()
+        cls.authorized_client.force_login(cls.user)
+        cls.author_client = Client()
+        cls.author_client.force_login(cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    def url_for(self, name):
+        author, post_id = self.author.username, self.post.pk
+        args = {
+            'group': [self.group.slug],
+            'api_group': [self.group.slug],
+            'api_profile': [author],
+            'profile_follow': [self.stranger.username],
+            'profile_unfollow': [author],
+            'profile': [author],
+            'post': [author, post_id],
+            'post_comments': [author, post_id],
+            'post_edit': [author, post_id],
+            'add_comment': [author, post_id],
+        }
+        url = reverse(name, args=args.get(name, []))
+        return url + '?q=Post' if name == 'search' else url
+
+    def data_for(self, name):
+        return {
+            'new_post': {'text': 'Budgeted post', 'group': self.group.pk},
+            'add_comment': {'text': 'Budgeted comment'},
+        }.get(name)
+
+    def request(self, client, name):
+        data = self.data_for(name)
+        if data is None:
+            return client.get(self.url_for(name))
+        return client.post(self.url_for(name), data)
+
+    def written(self, name):
+        """Whether the write of `name` happened."""
+        return {
+            'new_post': lambda: Post.objects.filter(
+                text='Budgeted post', author=self.user,
+            ).exists(),
+            'add_comment': lambda: Comment.objects.filter(
+                text='Budgeted comment', author=self.user,
+            ).exists(),
+            'profile_follow': lambda: Follow.objects.filter(
+                user=self.user, author=self.stranger,
+            ).exists(),
+            'profile_unfollow': lambda: not Follow.objects.filter(
+                user=self.user, author=self.author,
+            ).exists(),
+        }[name]()
+
+    def test_every_url_has_a_budget(self):
+        names = {pattern.name for pattern in urlpatterns}
+        self.assertEqual(names, set(QUERY_BUDGETS))
+
+    def test_query_budgets(self):
+        for name, (logged_in, budget) in QUERY_BUDGETS.items():
+            with self.subTest(url=name):
+                if name in AS_AUTHOR:
+                    client = self.author_client
+                elif logged_in:
+                    client = self.authorized_client
+                else:
+                    client = Client()
+                # Worst case: nothing cached, not even in this process.
+                cache.clear()
+                tiered.forget_all()
+                # Each request starts from the same rows.
+                with transaction.atomic():
+                    with self.assertNumQueries(budget):
+                        response = self.request(client, name)
+                    if name in AS_AUTHOR:
+                        self.assertEqual(response.status_code, 200)
+                    if name in WRITES:
+                        self.assertEqual(response.status_code, 302)
+                        self.assertTrue(self.written(name))
+                    transaction.set_rollback(True)
+
+
+class FeedIndexTest(TestCase):
+    def test_feed_queries_use_indexes(self):
+        call_command('explain_feeds', '--check', stdout=StringIO())
+
+    def test_follow_is_unique(self):
+        user = User.objects.create_user(username='Twice')
+        author = User.objects.create_user(username='Once')
+        Follow.objects.create(user=user, author=author)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Follow.objects.create(user=user, author=author)
@@ -0,0 +1,52 @@
+from django.contrib.admin.sites import site
+from django.core.cache import cache
+from django.test import TestCase, Client, RequestFactory
+from django.urls import reverse
+
+from posts import search
+from posts.models import Post, User
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Seeker')
+        cls.tea = Post.objects.create(text='Чай с мятой', author=cls.user)
+        cls.coffee = Post.objects.create(
+            text='Кофе, кофе и ещё раз кофе', author=cls.user,
+        )
+        Post.objects.create(text='Кофе без сахара', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_results_are_ranked(self):
+        found = search.search('кофе', limit=10)
+        self.assertEqual(len(found), 2)
+        self.assertEqual(found[0], self.coffee)
+
+    def test_index_follows_edits_and_deletes(self):
+        tea = Post.objects.get(pk=self.tea.pk)
+        tea.text = 'Зелёный чай'
+        tea.save()
+        self.assertEqual(search.search('мятой', limit=10), [])
+        self.assertEqual(search.search('зелёный', limit=10), [tea])
+        tea.delete()
+        self.assertEqual(search.search('чай', limit=10), [])
+
+    def test_fts_syntax_is_escaped(self):
+        self.assertEqual(search.search('кофе" OR (', limit=10), [])
+
+    def test_search_page(self):
+        response = Client().get(reverse('search'), {'q': 'чай'})
+        self.assertEqual(list(response.context['posts']), [self.tea])
+        self.assertContains(response, 'Чай с мятой')
+
+    def test_admin_uses_index(self):
+        request = RequestFactory().get('/admin/posts/post/')
+        queryset, distinct = site._registry[Post].get_search_results(
+            request, Post.objects.all(), 'мятой',
+        )
+        self.assertEqual(list(queryset), [self.tea])
+        self.assertFalse(distinct)
@@ -0,0 +1,63 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from posts.counters import recount
+from posts.models import Comment, Follow, Post, TimelineEntry, User
+from posts.search import matching_ids
+
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class SeedTest(TestCase):
+    OPTIONS = {
+        'users': 30, 'groups': 3, 'posts': 200, 'comments': 400,
+        'follows': 5, 'seed': 7, 'stdout': StringIO(),
+    }
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def snapshot(self):
+        first_user = User.objects.order_by('pk').first().pk
+        first_post = Post.objects.order_by('pk').first().pk
+        return (
+            list(Post.objects.order_by('pk').values_list(
+                'text', 'comment_count',
+            )),
+            sorted(
+                (user - first_user, author - first_user)
+                for user, author in Follow.objects.values_list(
+                    'user_id', 'author_id',
+                )
+            ),
+            sorted(
+                post - first_post
+                for post in Comment.objects.values_list('post_id', flat=True)
+            ),
+        )
+
+    def test_seeds_consistent_rows(self):
+        call_command('seed_yatube', images=0.1, **self.OPTIONS)
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertEqual(Comment.objects.count(), 400)
+        self.assertTrue(Post.objects.exclude(image='').exists())
+        self.assertTrue(TimelineEntry.objects.exists())
+        self.assertEqual(set(recount().values()), {0})
+        post = Post.objects.first()
+        self.assertIn(post.pk, matching_ids(post.text, limit=200))
+
+    def test_same_seed_same_data(self):
+        call_command('seed_yatube', **self.OPTIONS)
+        first = self.snapshot()
+        User.objects.all().delete()
+        call_command('seed_yatube', **self.OPTIONS)
+        self.assertEqual(self.snapshot(), first)
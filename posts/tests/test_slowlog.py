@@ -0,0 +1,92 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from posts import slowlog
+from posts.models import Post, User
+
+
+class SlowQueryLogTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Sluggish')
+        Post.objects.create(text='Медленный пост', author=cls.user)
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.log = os.path.join(directory, 'slow.jsonl')
+        for name, value in (
+            ('LOG_PATH', self.log), ('THRESHOLD_MS', 0), ('SAMPLE_RATE', 1),
+        ):
+            patcher = mock.patch.object(slowlog, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def get_profile(self):
+        # Render every time rather than hit the public page cache.
+        cache.clear()
+        with self.assertLogs('posts.slow_queries', 'WARNING'):
+            self.client.get(reverse('profile', args=[self.user.username]))
+
+    def test_fingerprint_ignores_literals(self):
+        self.assertEqual(
+            slowlog.fingerprint(
+                "SELECT * FROM posts_post WHERE id IN (1, 2, 3) AND "
+                "text = 'a'"
+            ),
+            slowlog.fingerprint(
+                'SELECT *  FROM posts_post WHERE id IN (%s, %s) AND text = %s'
+            ),
+        )
+
+    def test_slow_queries_are_attributed_to_the_view(self):
+        self.get_profile()
+        entries = list(slowlog.read(self.log))
+        self.assertTrue(entries)
+        self.assertEqual({entry['view'] for entry in entries}, {'profile'})
+        self.assertTrue(any(
+            frame.startswith(os.path.join('posts', 'views.py'))
+            for entry in entries for frame in entry['stack']
+        ))
+
+    def test_unsampled_requests_are_not_logged(self):
+        with mock.patch.object(slowlog, 'SAMPLE_RATE', 0):
+            self.client.get(reverse('profile', args=[self.user.username]))
+        self.assertFalse(os.path.exists(self.log))
+
+    def test_log_is_created_private(self):
+        log = os.path.join(os.path.dirname(self.log), 'var', 'slow.jsonl')
+        with mock.patch.object(slowlog, 'LOG_PATH', log), \
+                self.assertLogs('posts.slow_queries', 'WARNING'):
+            slowlog.record('SELECT 1', 1, 'index')
+        self.assertEqual(os.stat(log).st_mode & 0o077, 0)
+
+    def test_log_is_rotated_at_its_size_cap(self):
+        with mock.patch.object(slowlog, 'LOG_MAX_BYTES', 1):
+            for duration in (1, 2, 3):
+                with self.assertLogs('posts.slow_queries', 'WARNING'):
+                    slowlog.record('SELECT 1', duration, 'index')
+        self.assertTrue(os.path.exists(self.log + '.1'))
+        self.assertEqual(
+            [entry['duration_ms'] for entry in slowlog.read(self.log)],
+            [2, 3],
+        )
+
+    def test_summary_ranks_fingerprints(self):
+        self.get_profile()
+        self.get_profile()
+        out = StringIO()
+        call_command('slow_queries', log=self.log, view='profile', stdout=out)
+        summary = out.getvalue()
+        self.assertIn('fingerprints', summary)
+        self.assertIn('count 2', summary)
+        self.assertIn('profile x2', summary)
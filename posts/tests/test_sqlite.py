@@ -0,0 +1,49 @@
+from io import StringIO
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from posts import sqlite
+
+
+class SQLiteProfileTest(TestCase):
+    def pragma(self, conn, name):
+        with conn.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_production_profile_tunes_new_connections(self):
+        fresh = connection.copy()
+        # A private database: the shared test one is inside a transaction.
+        fresh.settings_dict = dict(fresh.settings_dict, NAME=':memory:')
+        try:
+            with override_settings(SQLITE_PROFILE='production'):
+                fresh.ensure_connection()
+            self.assertEqual(self.pragma(fresh, 'busy_timeout'), 5000)
+            self.assertEqual(self.pragma(fresh, 'cache_size'), -65536)
+            self.assertEqual(self.pragma(fresh, 'synchronous'), 1)
+        finally:
+            fresh.close()
+
+    def test_single_pragmas_override_the_profile(self):
+        with override_settings(
+            SQLITE_PROFILE='production',
+            SQLITE_PRAGMAS={'busy_timeout': 250},
+        ):
+            values = sqlite.pragmas()
+        self.assertEqual(values['busy_timeout'], 250)
+        self.assertEqual(values['journal_mode'], 'wal')
+        self.assertEqual(sqlite.pragmas('default'), {})
+
+    def test_unknown_profile_is_refused(self):
+        with override_settings(SQLITE_PROFILE='fastest'):
+            with self.assertRaises(ImproperlyConfigured):
+                sqlite.check_profile()
+        sqlite.check_profile()
+
+    def test_maintenance_command_analyzes(self):
+        out = StringIO()
+        call_command('sqlite_maintenance', stdout=out)
+        self.assertIn('ANALYZE done', out.getvalue())
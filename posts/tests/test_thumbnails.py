@@ -0,0 +1,120 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts import cache as page_cache
+from posts import thumbnails
+from posts.models import Post, User
+from posts.templatetags import post_thumbnails
+
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+SMALL_GIF = (
+    b"\x47\x49\x46\x38\x39\x61\x01\x00\x01\x00\x00\x00\x00\x21\xf9\x04"
+    b"\x01\x0a\x00\x01\x00\x2c\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02"
+    b"\x02\x4c\x01\x00\x3b"
+)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ThumbnailTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Painter')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            text='С картинкой',
+            author=self.user,
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'),
+        )
+
+    def test_render_falls_back_to_original_until_ready(self):
+        response = self.client.get(
+            reverse('profile', args=[self.user.username])
+        )
+        self.assertContains(response, self.post.image.url)
+        self.assertIsNone(thumbnails.ready_thumbnail(self.post.image))
+
+    def test_scheduled_thumbnail_becomes_ready(self):
+        self.assertIsNone(thumbnails.ready_thumbnail(self.post.image))
+        with mock.patch.object(thumbnails, 'WORKERS', 0):
+            thumbnails.schedule(self.post.image)
+        ready = thumbnails.ready_thumbnail(self.post.image)
+        self.assertIsNotNone(ready)
+        response = self.client.get(
+            reverse('profile', args=[self.user.username])
+        )
+        self.assertContains(response, ready.url)
+
+    def test_cached_pages_show_the_thumbnail_once_ready(self):
+        urls = [
+            reverse('index'),
+            reverse('profile', args=[self.user.username]),
+            reverse('post', args=[self.user.username, self.post.pk]),
+        ]
+        for url in urls:
+            self.assertContains(self.client.get(url), self.post.image.url)
+        with mock.patch.object(thumbnails, 'WORKERS', 0):
+            thumbnails.schedule(self.post.image)
+        ready = thumbnails.ready_thumbnail(self.post.image)
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), ready.url)
+
+    def test_unreadable_image_keeps_the_cached_pages(self):
+        post = Post.objects.create(
+            text='Битая картинка',
+            author=self.user,
+            image=SimpleUploadedFile('broken.gif', b'not a gif', 'image/gif'),
+        )
+        immediately = mock.Mock(on_commit=lambda callback: callback())
+        with mock.patch.object(thumbnails, 'WORKERS', 0), \
+                mock.patch.object(
+                    post_thumbnails, 'transaction', immediately,
+                ), \
+                self.assertLogs('sorl.thumbnail', 'ERROR'):
+            self.client.get(reverse('index'))
+            generation = page_cache.generation('index_page')
+            with mock.patch.object(thumbnails.backend, 'get_thumbnail') as get:
+                response = self.client.get(reverse('index'))
+        get.assert_not_called()
+        self.assertEqual(page_cache.generation('index_page'), generation)
+        self.assertContains(response, post.image.url)
+
+    def test_prefetch_resolves_a_page_in_one_query(self):
+        posts = [self.post] + [
+            Post.objects.create(
+                text=f'Ещё {number}',
+                author=self.user,
+                image=SimpleUploadedFile(
+                    f'more{number}.gif', SMALL_GIF, 'image/gif'
+                ),
+            )
+            for number in range(3)
+        ]
+        with mock.patch.object(thumbnails, 'WORKERS', 0):
+            thumbnails.schedule(self.post.image)
+        cache.clear()
+        with self.assertNumQueries(1):
+            prefetched = thumbnails.prefetch(posts)
+        self.assertEqual(
+            prefetched[self.post.image.name].name,
+            thumbnails.ready_thumbnail(self.post.image).name,
+        )
+        self.assertIsNone(prefetched[posts[1].image.name])
+        with self.assertNumQueries(0):
+            thumbnails.prefetch(posts)
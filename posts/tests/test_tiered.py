@@ -0,0 +1,167 @@
+from unittest import mock
+
+from django.contrib.flatpages.models import FlatPage
+from django.contrib.sites.models import Site
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from posts import tiered
+from posts.models import Group, User
+
+
+class LocalCacheTest(SimpleTestCase):
+    def test_least_recently_used_entry_goes_first(self):
+        local = tiered.LocalCache(max_entries=2)
+        local.set('a', 1)
+        local.set('b', 2)
+        local.get('a')
+        local.set('c', 3)
+        self.assertEqual(local.get('a'), 1)
+        self.assertIs(local.get('b'), tiered.MISSING)
+        self.assertEqual(len(local), 2)
+
+    def test_size_is_bounded(self):
+        local = tiered.LocalCache(max_bytes=300)
+        local.set('a', 'x' * 200)
+        local.set('b', 'y' * 200)
+        self.assertIs(local.get('a'), tiered.MISSING)
+        local.set('c', 'z' * 400)
+        self.assertIs(local.get('c'), tiered.MISSING)
+        self.assertEqual(local.get('b'), 'y' * 200)
+
+    def test_entries_expire(self):
+        local = tiered.LocalCache(ttl=0)
+        local.set('a', 1)
+        self.assertIs(local.get('a'), tiered.MISSING)
+
+    def test_hits_are_copies(self):
+        local = tiered.LocalCache()
+        local.set('a', {'stats': None})
+        local.get('a')['stats'] = 'leaked'
+        self.assertEqual(local.get('a'), {'stats': None})
+
+
+class TieredCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.group = Group.objects.create(
+            title='Hot', slug='hot', description='Read all the time',
+        )
+        cls.author = User.objects.create_user(username='Popular')
+
+    def setUp(self):
+        cache.clear()
+        tiered.forget_all()
+
+    def worker(self):
+        """Another process's tier over the same namespace."""
+        tier = tiered.TieredCache(
+            'groups', lambda slug: Group.objects.filter(slug=slug).first(),
+        )
+        self.addCleanup(tiered.TieredCache.instances.remove, tier)
+        return tier
+
+    def test_hot_lookups_skip_the_database_and_shared_cache(self):
+        with self.assertNumQueries(1):
+            tiered.groups.get('hot')
+        with mock.patch.object(cache, 'get') as shared_get:
+            with self.assertNumQueries(0):
+                group = tiered.groups.get('hot')
+        shared_get.assert_not_called()
+        self.assertEqual(group, self.group)
+
+    def test_new_worker_reads_the_shared_tier(self):
+        tiered.groups.get('hot')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.worker().get('hot'), self.group)
+
+    def test_missing_objects_are_cached(self):
+        with self.assertNumQueries(1):
+            self.assertIsNone(tiered.groups.get('cold'))
+        with self.assertNumQueries(0):
+            self.assertIsNone(tiered.groups.get('cold'))
+
+    def test_invalidation_reaches_other_workers(self):
+        other = self.worker()
+        self.assertEqual(other.get('hot').title, 'Hot')
+        Group.objects.filter(pk=self.group.pk).update(title='Renamed')
+        tiered.groups.invalidate()
+        # Trusted until the next generation check...
+        self.assertEqual(other.get('hot').title, 'Hot')
+        with mock.patch.object(tiered, 'CHECK_INTERVAL', 0):
+            self.assertEqual(other.get('hot').title, 'Renamed')
+
+    def test_group_edit_invalidates(self):
+        tiered.groups.get('hot')
+        self.group.title = 'Renamed'
+        self.group.save()
+        self.assertEqual(tiered.groups.get('hot').title, 'Renamed')
+
+    def test_new_user_replaces_a_cached_miss(self):
+        url = reverse('api_profile', args=['Newcomer'])
+        self.assertEqual(self.client.get(url).status_code, 404)
+        User.objects.create_user(username='Newcomer')
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_users_are_cached_without_credentials(self):
+        user = tiered.users.get(self.author.username)
+        self.assertEqual(user.pk, self.author.pk)
+        self.assertTrue(
+            {'password', 'email', 'is_superuser'}
+            <= user.get_deferred_fields()
+        )
+
+    def test_login_keeps_the_cached_user(self):
+        tiered.users.get(self.author.username)
+        self.client.force_login(self.author)
+        with self.assertNumQueries(0):
+            tiered.users.get(self.author.username)
+
+    def test_warm_group_feed_costs_one_query(self):
+        url = reverse('api_group', args=[self.group.slug])
+        with self.assertNumQueries(2):
+            self.client.get(url)
+        with self.assertNumQueries(1):
+            self.client.get(url)
+
+
+class FlatpageTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.page = FlatPage.objects.create(
+            url='/terms/', title='Terms', content='Be nice',
+        )
+        cls.page.sites.add(Site.objects.get_current())
+
+    def setUp(self):
+        cache.clear()
+        tiered.forget_all()
+        self.url = reverse(
+            'django.contrib.flatpages.views.flatpage', args=['terms/'],
+        )
+
+    def test_page_is_served_from_the_cache(self):
+        self.assertContains(self.client.get(self.url), 'Be nice')
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertContains(response, 'Be nice')
+
+    def test_edit_invalidates(self):
+        self.client.get(self.url)
+        self.page.content = 'Be kind'
+        self.page.save()
+        self.assertContains(self.client.get(self.url), 'Be kind')
+
+    def test_site_removal_invalidates(self):
+        self.client.get(self.url)
+        self.page.sites.clear()
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_missing_slash_redirects(self):
+        response = self.client.get('/about/terms')
+        self.assertRedirects(
+            response, '/about/terms/', status_code=301,
+            fetch_redirect_response=False,
+        )
+        self.assertEqual(self.client.get('/about/none/').status_code, 404)
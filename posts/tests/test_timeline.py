@@ -0,0 +1,90 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from posts import signals, timeline
+from posts.models import Follow, Post, TimelineEntry, User
+
+
+class TimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.author = User.objects.create_user(username='Writer')
+        cls.client_reader = Client()
+        cls.client_reader.force_login(cls.reader)
+        cls.other = User.objects.create_user(username='Other')
+
+    def test_new_post_is_fanned_out_to_followers(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='Fan out', author=self.author)
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post=post).exists()
+        )
+
+    def test_follow_backfills_and_unfollow_prunes(self):
+        post = Post.objects.create(text='Old post', author=self.author)
+        self.client_reader.get(
+            reverse('profile_follow', args=[self.author.username])
+        )
+        response = self.client_reader.get(reverse('follow_index'))
+        self.assertIn(post, response.context['page'])
+
+        self.client_reader.get(
+            reverse('profile_unfollow', args=[self.author.username])
+        )
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.reader).exists()
+        )
+        response = self.client_reader.get(reverse('follow_index'))
+        self.assertNotIn(post, response.context['page'])
+
+    def test_popular_author_is_pulled_not_fanned_out(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        with mock.patch.object(timeline, 'FANOUT_LIMIT', 0):
+            post = Post.objects.create(text='Pulled', author=self.author)
+            feed = list(timeline.feed(self.reader))
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        self.assertIn(post, feed)
+
+    def test_follow_of_a_pulled_author_is_backfilled(self):
+        Follow.objects.create(user=self.other, author=self.author)
+        with mock.patch.object(timeline, 'FANOUT_LIMIT', 0):
+            post = Post.objects.create(text='Pulled', author=self.author)
+            Follow.objects.create(user=self.reader, author=self.author)
+        self.assertFalse(timeline.is_pulled(self.author.pk))
+        self.assertIn(post, timeline.feed(self.reader))
+
+    def test_author_back_under_the_limit_is_caught_up(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.other, author=self.author)
+        with mock.patch.object(timeline, 'FANOUT_LIMIT', 1), \
+                mock.patch.object(
+                    signals.transaction, 'on_commit',
+                    lambda callback: callback(),
+                ):
+            post = Post.objects.create(text='Pulled', author=self.author)
+            self.assertIn(post, timeline.feed(self.reader))
+            Follow.objects.get(user=self.other, author=self.author).delete()
+            self.assertFalse(timeline.is_pulled(self.author.pk))
+            self.assertIn(post, timeline.feed(self.reader))
+
+    def test_backfill_stops_at_the_limit(self):
+        posts = []
+        for number in range(3):
+            post = Post.objects.create(
+                text=f'Post {number}', author=self.author,
+            )
+            Post.objects.filter(pk=post.pk).update(
+                pub_date=post.pub_date + timedelta(hours=number),
+            )
+            posts.append(post)
+        with mock.patch.object(timeline, 'BACKFILL_LIMIT', 2):
+            Follow.objects.create(user=self.reader, author=self.author)
+        # Older history is left out of a new follower's feed.
+        self.assertEqual(
+            set(timeline.feed(self.reader)), set(posts[1:]),
+        )
@@ -6,6 +6,7 @@ from django.core.files.base import File
 from django.core.files.uploadedfile import SimpleUploadedFile
 
 from posts.models import Comment, Follow, Group, Post, User
+from posts.paginator import COMMENT_PAGE_SIZE
 
 
 class ViewsTest(TestCase):
@@ -242,3 +243,46 @@ class ViewsTest(TestCase):
             (author=self.second_user,
              user=self.user).exists()
         )
+
+
+class CommentPaginationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='Talker')
+        cls.post = Post.objects.create(text='Popular', author=cls.user)
+        for number in range(COMMENT_PAGE_SIZE + 5):
+            Comment.objects.create(
+                post=cls.post, author=cls.user, text=f'Comment {number}',
+            )
+        cls.args = [cls.user.username, cls.post.pk]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_post_page_shows_first_batch(self):
+        response = self.client.get(reverse('post', args=self.args))
+        comments = response.context['comments']
+        self.assertEqual(len(comments), COMMENT_PAGE_SIZE)
+        self.assertEqual(comments[0].text, f'Comment {COMMENT_PAGE_SIZE + 4}')
+        self.assertContains(response, reverse('post_comments', args=self.args))
+
+    def test_load_more_returns_the_rest(self):
+        cursor = self.client.get(
+            reverse('post', args=self.args),
+        ).context['comment_cursor']
+        response = self.client.get(
+            reverse('post_comments', args=self.args),
+            {'after': cursor.next_token},
+        )
+        self.assertEqual(
+            [comment.text for comment in response.context['comments']],
+            [f'Comment {number}' for number in range(4, -1, -1)],
+        )
+        self.assertNotContains(response, 'more-comments')
+        self.assertNotContains(response, '<html')
+
+    def test_unknown_post_is_not_found(self):
+        response = self.client.get(
+            reverse('post_comments', args=[self.user.username, 0]),
+        )
+        self.assertEqual(response.status_code, 404)
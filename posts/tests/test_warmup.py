@@ -0,0 +1,35 @@
+import copy
+
+from django.conf import settings
+from django.template import engines
+from django.test import SimpleTestCase, override_settings
+
+from posts import warmup
+
+
+def cached_templates():
+    templates = copy.deepcopy(settings.TEMPLATES)
+    templates[0]['APP_DIRS'] = False
+    templates[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
+    return templates
+
+
+class WarmupTest(SimpleTestCase):
+    def test_every_project_template_compiles(self):
+        report = warmup.run()
+        self.assertEqual(report['failed'], [])
+        self.assertIn('base.html', report['templates'])
+        self.assertIn('includes/post_item.html', report['templates'])
+        self.assertGreater(report['routes'], 0)
+
+    @override_settings(TEMPLATES=cached_templates())
+    def test_cached_loader_keeps_compiled_templates(self):
+        warmup.run()
+        loader = engines.all()[0].engine.template_loaders[0]
+        self.assertIn('base.html', loader.get_template_cache)
+        self.assertIn('includes/comment_list.html', loader.get_template_cache)
@@ -0,0 +1,174 @@
+"""Feed thumbnails rendered off the request path.
+
+Uploads are handed to a small worker pool as soon as the post is
+committed. Templates only ever ask the KV store whether the thumbnail
+is ready and show the original image until it is, so a render never
+waits on Pillow. Once a thumbnail is built, the cached pages showing
+the original are dropped. Images that cannot be rendered are not
+retried for `THUMBNAIL_RETRY_AFTER` seconds, and leave the pages alone.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import (
+    EMPTY_VALUE, KVStore as CachedDBKVStore,
+)
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from . import cache as page_cache
+from . import conditional
+from .models import Post
+
+
+logger = logging.getLogger(__name__)
+
+FEED_GEOMETRY = '960x339'
+FEED_OPTIONS = {'crop': 'center', 'upscale': True}
+WORKERS = getattr(settings, 'THUMBNAIL_WORKERS', 2)
+RETRY_AFTER = getattr(settings, 'THUMBNAIL_RETRY_AFTER', 60 * 60)
+
+
+class FeedThumbnailBackend(ThumbnailBackend):
+    def thumbnail_file(self, file_, geometry_string, **options):
+        """The file a thumbnail would be stored as, without rendering it."""
+        source = ImageFile(file_)
+        if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(thumbnail_settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return ImageFile(name, default.storage)
+
+
+backend = FeedThumbnailBackend()
+
+_executor = None
+_pending = set()
+_lock = threading.Lock()
+
+
+def feed_thumbnail_file(image):
+    return backend.thumbnail_file(image, FEED_GEOMETRY, **FEED_OPTIONS)
+
+
+def ready_thumbnail(image):
+    """The feed thumbnail of `image` if already built, else None."""
+    if not image:
+        return None
+    return default.kvstore.get(feed_thumbnail_file(image))
+
+
+def _get_many_raw(keys):
+    """Raw KV store values for `keys`: one cache round trip, one query."""
+    kvstore = default.kvstore
+    if not isinstance(kvstore, CachedDBKVStore):
+        return {key: kvstore._get_raw(key) for key in keys}
+    values = kvstore.cache.get_many(keys)
+    missing = [key for key in keys if key not in values]
+    if missing:
+        found = dict(
+            KVStoreModel.objects.filter(key__in=missing)
+            .values_list('key', 'value')
+        )
+        fetched = {key: found.get(key, EMPTY_VALUE) for key in missing}
+        kvstore.cache.set_many(
+            fetched, thumbnail_settings.THUMBNAIL_CACHE_TIMEOUT,
+        )
+        values.update(fetched)
+    return {
+        key: None if value == EMPTY_VALUE else value
+        for key, value in values.items()
+    }
+
+
+def prefetch(posts):
+    """Map image name to its ready feed thumbnail (or None) for a page."""
+    keys = {
+        post.image.name: add_prefix(feed_thumbnail_file(post.image).key)
+        for post in posts if post.image
+    }
+    if not keys:
+        return {}
+    values = _get_many_raw(list(keys.values()))
+    return {
+        name: deserialize_image_file(values[key]) if values.get(key) else None
+        for name, key in keys.items()
+    }
+
+
+def refresh_pages(name):
+    """Drop the cached pages of the posts showing image `name`."""
+    rows = Post.objects.filter(image=name).values_list(
+        'pk', 'author__username', 'group__slug',
+    )
+    names, tags = [], []
+    for pk, username, slug in rows:
+        names += [conditional.post_key(pk), conditional.profile_key(username)]
+        if slug is not None:
+            names.append(conditional.group_key(slug))
+        tags.append(f'post:{pk}')
+    if tags:
+        conditional.bump(*names)
+        page_cache.purge(*tags)
+        page_cache.bump('index_page')
+
+
+def _failed_key(name):
+    return f'thumbnail-failed:{name}'
+
+
+def _generate(name):
+    try:
+        backend.get_thumbnail(name, FEED_GEOMETRY, **FEED_OPTIONS)
+        # sorl logs and stores nothing when the source can't be read.
+        built = default.kvstore.get(feed_thumbnail_file(name)) is not None
+    except Exception:
+        logger.exception('Thumbnail generation failed for %s', name)
+        built = False
+    try:
+        if built:
+            refresh_pages(name)
+        else:
+            cache.set(_failed_key(name), True, RETRY_AFTER)
+    finally:
+        with _lock:
+            _pending.discard(name)
+        if WORKERS:
+            connection.close()
+
+
+def schedule(image):
+    """Queue the feed thumbnail of `image` unless already queued."""
+    global _executor
+    if not image:
+        return
+    name = image.name
+    if cache.get(_failed_key(name)):
+        return
+    with _lock:
+        if name in _pending:
+            return
+        _pending.add(name)
+        if WORKERS and _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=WORKERS,
+                thread_name_prefix='thumbnails',
+            )
+    if WORKERS:
+        _executor.submit(_generate, name)
+    else:
+        _generate(name)
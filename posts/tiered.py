@@ -0,0 +1,184 @@
+"""Two-tier read-through cache for small, hot objects.
+
+`TieredCache` answers from a bounded in-process LRU first, then from the
+shared Django cache, and only then calls its loader. Each namespace has
+a generation counter in the shared cache (see posts/cache.py) that is
+part of every shared key; `invalidate()` bumps it, and every worker
+re-reads it at most every `LOCAL_CACHE_CHECK_INTERVAL` seconds and
+drops its local entries when it moved. A hot lookup therefore costs
+neither a database query nor a cache round trip, and a change reaches
+the other workers within the check interval.
+
+Local entries are kept pickled and unpickled on every hit, so related
+objects cached on an instance during one request never leak into the
+next.
+"""
+import hashlib
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.flatpages.models import FlatPage
+from django.core.cache import cache
+from django.db import transaction
+from django.http import Http404
+
+from . import cache as generations
+from . import metrics
+from .models import Group, User
+
+
+MAX_ENTRIES = getattr(settings, 'LOCAL_CACHE_MAX_ENTRIES', 1024)
+MAX_BYTES = getattr(settings, 'LOCAL_CACHE_MAX_BYTES', 4 * 2 ** 20)
+TTL = getattr(settings, 'LOCAL_CACHE_TTL', 300)
+CHECK_INTERVAL = getattr(settings, 'LOCAL_CACHE_CHECK_INTERVAL', 1.0)
+SHARED_TIMEOUT = 60 * 60
+
+MISSING = object()
+
+
+class LocalCache:
+    """Thread-safe LRU bounded by entry count, total bytes and age."""
+
+    def __init__(self, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES,
+                 ttl=TTL):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=MISSING):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            data, expires = entry
+            if expires <= time.monotonic():
+                self._pop(key)
+                return default
+            self._data.move_to_end(key)
+        return pickle.loads(data)
+
+    def set(self, key, value):
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            self._pop(key)
+            self._data[key] = (data, time.monotonic() + self.ttl)
+            self._size += len(data)
+            while (len(self._data) > self.max_entries
+                   or self._size > self.max_bytes):
+                self._pop(next(iter(self._data)))
+
+    def _pop(self, key):
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self._size -= len(entry[0])
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._size = 0
+
+
+class TieredCache:
+    instances = []
+
+    def __init__(self, namespace, load, **local_options):
+        self.namespace = namespace
+        self.load = load
+        self.local = LocalCache(**local_options)
+        self._generation = None
+        self._checked = float('-inf')
+        self._lock = threading.Lock()
+        TieredCache.instances.append(self)
+
+    def generation(self):
+        """The namespace generation, re-read every `CHECK_INTERVAL`."""
+        with self._lock:
+            now = time.monotonic()
+            if now - self._checked >= CHECK_INTERVAL:
+                current = generations.generation(self.namespace)
+                if current != self._generation:
+                    self.local.clear()
+                    self._generation = current
+                self._checked = now
+            return self._generation
+
+    def _shared_key(self, key, generation):
+        digest = hashlib.md5(repr(key).encode()).hexdigest()
+        return f'tiered:{self.namespace}:{generation}:{digest}'
+
+    def get(self, key):
+        """The loader's value for `key`, None included."""
+        generation = self.generation()
+        value = self.local.get(key)
+        if value is not MISSING:
+            metrics.cache_lookup('local', 'hit')
+            return value
+        metrics.cache_lookup('local', 'miss')
+        shared_key = self._shared_key(key, generation)
+        value = cache.get(shared_key, MISSING)
+        metrics.cache_lookup(
+            'shared', 'miss' if value is MISSING else 'hit',
+        )
+        if value is MISSING:
+            value = self.load(key)
+            cache.set(shared_key, value, SHARED_TIMEOUT)
+        # Skip if invalidated meanwhile: the value may predate that.
+        if self._generation == generation:
+            self.local.set(key, value)
+        return value
+
+    def forget(self):
+        """Drop this worker's entries; the next lookup re-reads the tier."""
+        with self._lock:
+            self.local.clear()
+            self._checked = float('-inf')
+
+    def invalidate(self):
+        """Drop the namespace in every worker."""
+        def bump():
+            generations.bump(self.namespace)
+            self.forget()
+        bump()
+        # Again on commit: a value loaded before then saw the old rows.
+        transaction.on_commit(bump)
+
+
+def forget_all():
+    for tier in TieredCache.instances:
+        tier.forget()
+
+
+def get_or_404(tier, key):
+    value = tier.get(key)
+    if value is None:
+        raise Http404(f'No {tier.namespace} entry matches {key!r}.')
+    return value
+
+
+groups = TieredCache(
+    'groups', lambda slug: Group.objects.filter(slug=slug).first(),
+)
+# Lookups only need the key; credentials and flags stay out of caches.
+users = TieredCache(
+    'users',
+    lambda username: User.objects.only('pk', 'username').filter(
+        username=username,
+    ).first(),
+)
+flatpages = TieredCache(
+    'flatpages',
+    lambda url: FlatPage.objects.filter(
+        url=url, sites=settings.SITE_ID,
+    ).first(),
+)
@@ -0,0 +1,122 @@
+"""Fan-out-on-write follow feed.
+
+Every new post is copied into a `TimelineEntry` row per follower, so
+`follow_index` reads a single `(user, pub_date)` index range instead of
+joining Follow and Post. Authors with more than `TIMELINE_FANOUT_LIMIT`
+followers are not fanned out; their posts are pulled at read time.
+
+A new follow copies in the author's latest `TIMELINE_BACKFILL_LIMIT`
+posts, pulled or not, and when an author drops back to the limit every
+remaining follower gets the same catch-up, since the posts made while
+pulled were never fanned out. Older posts are not backfilled: the feed
+of a new follower starts at that depth.
+"""
+from django.conf import settings
+from django.db.models import F, Q
+
+from .models import Follow, Post, TimelineEntry, UserStats
+
+
+FANOUT_LIMIT = getattr(settings, 'TIMELINE_FANOUT_LIMIT', 1000)
+BACKFILL_LIMIT = getattr(settings, 'TIMELINE_BACKFILL_LIMIT', 200)
+BATCH_SIZE = 500
+# Keyset paginator keys of `feed()`: the timeline's own columns, so the
+# page is read straight off the (user, pub_date, post) index.
+FEED_KEYS = ('feed_date', 'feed_post')
+
+
+def follower_count(author_id):
+    return UserStats.objects.filter(user_id=author_id).values_list(
+        'followers', flat=True,
+    ).first() or 0
+
+
+def is_pulled(author_id):
+    """Authors over the fan-out limit are read on demand."""
+    return follower_count(author_id) > FANOUT_LIMIT
+
+
+def fan_out(post):
+    if is_pulled(post.author_id):
+        return
+    follower_ids = Follow.objects.filter(
+        author_id=post.author_id,
+    ).values_list('user_id', flat=True)
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(
+                user_id=user_id,
+                post_id=post.pk,
+                author_id=post.author_id,
+                pub_date=post.pub_date,
+            )
+            for user_id in follower_ids.iterator()
+        ),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def backfill(user_id, author_id):
+    backfill_followers(author_id, [user_id])
+
+
+def backfill_followers(author_id, user_ids):
+    """Copy the author's latest posts into each of `user_ids`' feed."""
+    recent = list(Post.objects.filter(
+        author_id=author_id,
+    ).order_by('-pub_date').values_list('pk', 'pub_date')[:BACKFILL_LIMIT])
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(
+                user_id=user_id,
+                post_id=post_id,
+                author_id=author_id,
+                pub_date=pub_date,
+            )
+            for user_id in user_ids
+            for post_id, pub_date in recent
+        ),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def catch_up(author_id):
+    """Backfill every follower once the author is no longer pulled."""
+    if is_pulled(author_id):
+        return
+    backfill_followers(
+        author_id,
+        Follow.objects.filter(author_id=author_id).values_list(
+            'user_id', flat=True,
+        ).iterator(),
+    )
+
+
+def prune(user_id, author_id):
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def pulled_author_ids(user):
+    followed = Follow.objects.filter(user=user).values('author_id')
+    return list(
+        UserStats.objects.filter(
+            user_id__in=followed,
+            followers__gt=FANOUT_LIMIT,
+        ).values_list('user_id', flat=True)
+    )
+
+
+def feed(user):
+    """Posts of the authors `user` follows, newest first."""
+    pulled = pulled_author_ids(user)
+    if not pulled:
+        return Post.objects.filter(timeline_entries__user=user).annotate(
+            feed_date=F('timeline_entries__pub_date'),
+            feed_post=F('timeline_entries__post'),
+        )
+    delivered = TimelineEntry.objects.filter(user=user).values('post_id')
+    return Post.objects.filter(
+        Q(pk__in=delivered) | Q(author_id__in=pulled)
+    ).annotate(feed_date=F('pub_date'), feed_post=F('pk'))
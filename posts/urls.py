@@ -1,6 +1,6 @@
 from django.urls import path
 
-from . import views
+from . import api, views
 
 
 urlpatterns = [
@@ -22,6 +22,36 @@ urlpatterns = [
         name='new_post'
     ),
 
+    path(
+        'search/',
+        views.post_search,
+        name='search'
+    ),
+
+    path(
+        'metrics/',
+        views.metrics,
+        name='metrics'
+    ),
+
+    path(
+        'api/posts/',
+        api.index,
+        name='api_index'
+    ),
+
+    path(
+        'api/group/<slug:slug>/',
+        api.group,
+        name='api_group'
+    ),
+
+    path(
+        'api/profile/<str:username>/',
+        api.profile,
+        name='api_profile'
+    ),
+
         path(
         "follow/",
         views.follow_index, 
@@ -52,6 +82,12 @@ urlpatterns = [
         name='post'
     ),
 
+    path(
+        '<str:username>/<int:post_id>/comments/',
+        views.post_comments,
+        name='post_comments'
+    ),
+
     path(
         '<str:username>/<int:post_id>/edit/', 
         views.post_edit, 
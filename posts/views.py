@@ -1,50 +1,108 @@
-from django.views.decorators.cache import cache_page
 from django.contrib.auth import get_user_model 
+from django.conf import settings
 from django.contrib.auth.decorators import login_required 
+from django.contrib.flatpages.views import render_flatpage
 from django.core.checks.messages import Error 
-from django.core.paginator import Paginator 
+from django.core.exceptions import PermissionDenied
+from django.db import transaction
 from django.contrib.auth import get_user_model 
 from django.shortcuts import get_object_or_404 
 from django.shortcuts import redirect, render 
+from django.http import Http404, HttpResponse, HttpResponsePermanentRedirect
+from django.views.decorators.http import condition
 
+from . import (
+    conditional, followed, metrics as request_metrics, search, thumbnails,
+    tiered, timeline,
+)
+from .cache import (
+    cache_page_by_generation, cache_public_page, tag_response,
+)
 from .forms import PostForm, CommentForm, FollowForm
-from .models import Group, Post, Follow
+from .models import Post, Follow, UserStats
+from .paginator import (
+    COMMENT_PAGE_SIZE, PAGE_SIZE, CursorPaginator, paginate,
+)
  
  
 User = get_user_model() 
+
+
+def feed_page(request, post_list, **kwargs):
+    """Keyset page of `post_list` with its thumbnails resolved in bulk."""
+    context = paginate(request, post_list, **kwargs)
+    context['thumbnail_map'] = thumbnails.prefetch(context['page'])
+    return context
+
+
+def card_tags(posts):
+    """Surrogate keys of the post cards in post_item.html."""
+    for post in posts:
+        yield f'post:{post.pk}'
+        # The author's name only; `author:` also covers their counters.
+        yield f'user:{post.author_id}'
+        if post.group_id:
+            yield f'group:{post.group_id}'
+
+
+def comment_page(request, post):
+    """Keyset page of the comments on `post`, authors joined in."""
+    comments, cursor = CursorPaginator(
+        post.comments.select_related('author'), COMMENT_PAGE_SIZE,
+    ).get_page(request.GET)
+    return {'comments': comments, 'comment_cursor': cursor}
  
  
+@condition(etag_func=conditional.group_etag)
+@cache_public_page(60 * 60 * 24)
 def group_posts(request, slug): 
 
-    group = get_object_or_404(Group, slug=slug) 
-    posts = group.posts.all()[:12] 
-    post_list = group.posts.all() 
-    paginator = Paginator(post_list, 10) 
-    page_number = request.GET.get('page') 
-    page = paginator.get_page(page_number) 
-    return render(request, 'group.html', {
-        'posts': posts, 
+    group = tiered.get_or_404(tiered.groups, slug)
+    post_list = group.posts.for_feed() 
+    context = feed_page(request, post_list)
+    response = render(request, 'group.html', {
         'group': group, 
-        'page': page,  
-        'paginator': paginator 
+        **context,
         },
     ) 
+    return tag_response(
+        response,
+        f'group:{group.pk}',
+        f'group-posts:{group.pk}',
+        *card_tags(context['page']),
+    )
 
 
-@cache_page(1 * 20, key_prefix='index_page')
+@cache_page_by_generation(60 * 60 * 24, key_prefix='index_page')
 def index(request):
-    post_list = Post.objects.all()
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    context = {
-        'page': page,
-        'paginator': paginator,
-    }
+    post_list = Post.objects.for_feed()
+    context = feed_page(request, post_list)
     return render(request, 'index.html', context)
  
 
+def post_search(request):
+    query = request.GET.get('q', '').strip()
+    try:
+        number = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        number = 1
+    found = search.search(
+        query,
+        limit=PAGE_SIZE + 1,
+        offset=(number - 1) * PAGE_SIZE,
+    ) if query else []
+    context = {
+        'query': query,
+        'posts': found[:PAGE_SIZE],
+        'number': number,
+        'has_next': len(found) > PAGE_SIZE,
+        'thumbnail_map': thumbnails.prefetch(found[:PAGE_SIZE]),
+    }
+    return render(request, 'search.html', context)
+
+
 @login_required 
+@transaction.atomic
 def new_post(request): 
 
     form = PostForm(request.POST or None, files=request.FILES or None) 
@@ -57,43 +115,73 @@ def new_post(request):
     post = form.save(commit=False) 
     post.author = request.user 
     post.save() 
+    transaction.on_commit(lambda: thumbnails.schedule(post.image))
     return redirect('index') 
 
      
+@condition(etag_func=conditional.profile_etag)
+@cache_public_page(60 * 60 * 24)
 def profile(request, username):
 
-    author = get_object_or_404(User, username=username)
+    author = get_object_or_404(
+        User.objects.select_related('stats'),
+        username=username,
+    )
     authors_posts = author.posts.all() 
-    post_list = author.posts.all()
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    following = author.following.exists()
+    post_list = author.posts.for_feed()
     context = {
         'posts': authors_posts, 
         'author': author,
-        'page': page,
-        'paginator': paginator,
-        'following': following,
+        'stats': UserStats.objects.for_user(author),
+        **feed_page(request, post_list),
     }
-    return render(request, 'profile.html', context)
+    return tag_response(
+        render(request, 'profile.html', context),
+        f'author:{author.pk}',
+        f'author-posts:{author.pk}',
+        *card_tags(context['page']),
+    )
 
 
+@condition(etag_func=conditional.post_etag)
+@cache_public_page(60 * 60 * 24)
 def post_view(request, username, post_id):
-    post = get_object_or_404(Post, pk=post_id, author__username=username)
-    author = post.author 
-    authors_posts = author.posts.all() 
-    count = authors_posts.count()
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'),
+        pk=post_id,
+        author__username=username,
+    )
+    stats = UserStats.objects.for_user(post.author)
     form = CommentForm()
-    comments = post.comments.all()
     context = {
-        'count': count,
+        'count': stats.posts,
+        'stats': stats,
         'author': post.author,
         'post': post,
         'form': form,
-        'comments': comments,
+        **comment_page(request, post),
+    }
+    return tag_response(
+        render(request, 'post.html', context),
+        f'author:{post.author_id}',
+        *card_tags([post]),
+        *(f'user:{comment.author_id}' for comment in context['comments']),
+    )
+
+
+def post_comments(request, username, post_id):
+    """Next batch of comments as bare HTML, for the "load more" link."""
+    post = get_object_or_404(
+        Post.objects.select_related('author'),
+        pk=post_id,
+        author__username=username,
+    )
+    context = {
+        'author': post.author,
+        'post': post,
+        **comment_page(request, post),
     }
-    return render(request, 'post.html', context)
+    return render(request, 'includes/comment_list.html', context)
 
 
 @login_required
@@ -105,7 +193,7 @@ def post_edit(request, username, post_id):
             files=request.FILES or None,
             instance=post
         )
-    if post.author != request.user: 
+    if post.author_id != request.user.pk: 
         return render(request, 'post.html', {
             'username': username, 
             'post_id': post.pk, 
@@ -119,11 +207,13 @@ def post_edit(request, username, post_id):
             'form': form
         },
         )    
-    form.save()
+    post = form.save()
+    transaction.on_commit(lambda: thumbnails.schedule(post.image))
     return redirect('post', username, post_id)
 
 
 @login_required
+@transaction.atomic
 def add_comment(request, username, post_id):
     post = get_object_or_404(Post, author__username=username, pk=post_id)
     form = CommentForm(request.POST or None,)
@@ -141,33 +231,51 @@ def add_comment(request, username, post_id):
 
 @login_required
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    context = {
-        'page': page,
-        'paginator': paginator,
-    }
+    posts = timeline.feed(request.user).for_feed()
+    context = feed_page(request, posts, keys=timeline.FEED_KEYS)
     return render(request, 'follow.html', context)  
 
     
 @login_required
+@transaction.atomic
 def profile_follow(request, username):
-    author = get_object_or_404(User, username=username)
-    following = author.following.exists()
+    author = tiered.get_or_404(tiered.users, username)
+    following = followed.is_following(request.user, author)
     if request.user != author and not following:
         Follow.objects.get_or_create(user=request.user, author=author)
     return redirect('profile', username=username)
 
 
 @login_required
+@transaction.atomic
 def profile_unfollow(request, username):
-    author = get_object_or_404(User, username=username)
+    author = tiered.get_or_404(tiered.users, username)
     get_object_or_404(Follow, user=request.user, author=author).delete()
     return redirect('profile', username=username)
         
 
+def metrics(request):
+    if not request_metrics.authorized(request):
+        raise PermissionDenied
+    return HttpResponse(
+        request_metrics.exposition(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
+
+
+def flatpage(request, url):
+    """contrib.flatpages' view, reading pages through the tiered cache."""
+    if not url.startswith('/'):
+        url = '/' + url
+    page = tiered.flatpages.get(url)
+    if page is None:
+        if (not url.endswith('/') and settings.APPEND_SLASH
+                and tiered.flatpages.get(url + '/') is not None):
+            return HttpResponsePermanentRedirect(request.path + '/')
+        raise Http404(f'No flatpage matches {url!r}.')
+    return render_flatpage(request, page)
+
+
 def page_not_found(request, exception):   
     return render(
         request, 
@@ -0,0 +1,69 @@
+"""Startup warm-up for web workers.
+
+`run()` builds the URL resolver's lookup tables (importing every view
+module on the way) and compiles each template under the template
+engines' `DIRS`, so a fresh worker's first requests do not pay for
+either. With the cached loader of `TEMPLATES_PROFILE = 'production'`
+the compiled templates stay in memory for the worker's lifetime;
+yatube/wsgi.py calls `run()` before the server gets the application.
+`manage.py bench_warmup` reports what it saves.
+"""
+import logging
+import os
+import time
+
+from django.template import TemplateDoesNotExist, TemplateSyntaxError
+from django.template import engines
+from django.urls import get_resolver
+
+logger = logging.getLogger('posts.warmup')
+
+EXTENSIONS = ('.html', '.txt')
+
+
+def template_names(directory):
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            if name.endswith(EXTENSIONS):
+                path = os.path.join(root, name)
+                yield os.path.relpath(path, directory).replace(os.sep, '/')
+
+
+def compile_templates():
+    """`(compiled, failed)` template names of every engine's DIRS."""
+    compiled, failed = [], []
+    for engine in engines.all():
+        for directory in engine.dirs:
+            for name in template_names(directory):
+                try:
+                    engine.get_template(name)
+                except (TemplateDoesNotExist, TemplateSyntaxError) as exc:
+                    logger.warning('Cannot compile %s: %s', name, exc)
+                    failed.append(name)
+                else:
+                    compiled.append(name)
+    return compiled, failed
+
+
+def resolve_urls():
+    resolver = get_resolver()
+    # Populated lazily on the first reverse() or resolve() otherwise.
+    return len(resolver.reverse_dict)
+
+
+def run():
+    started = time.perf_counter()
+    routes = resolve_urls()
+    compiled, failed = compile_templates()
+    seconds = time.perf_counter() - started
+    logger.info(
+        'Warm-up: %d URL names, %d templates (%d failed) in %.0f ms',
+        routes, len(compiled), len(failed), seconds * 1000,
+    )
+    return {
+        'routes': routes,
+        'templates': compiled,
+        'failed': failed,
+        'seconds': seconds,
+    }
@@ -36,6 +36,9 @@ INSTALLED_APPS = [
     'sorl.thumbnail',
 ]
 MIDDLEWARE = [
+    'posts.middleware.MetricsMiddleware',
+    'posts.middleware.SlowQueryMiddleware',
+    'posts.middleware.TemplateProfileMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -48,7 +51,7 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'posts.metrics.TimedDjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -57,10 +60,26 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'posts.context_processors.followed_authors',
             ],
         },
     },
 ]
+# Template loading profile: 'production' compiles each template once per
+# worker with the cached loader, whatever DEBUG says; 'default' leaves
+# the loaders to Django, which recompiles on every use while DEBUG is on
+TEMPLATES_PROFILE = os.environ.get('YATUBE_TEMPLATES_PROFILE', 'default')
+if TEMPLATES_PROFILE == 'production':
+    TEMPLATES[0]['APP_DIRS'] = False
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
+# Compile templates and resolve the URLconf in yatube/wsgi.py before a
+# worker takes traffic, see posts/warmup.py
+WARM_UP = os.environ.get('YATUBE_WARM_UP', '1') == '1'
 WSGI_APPLICATION = 'yatube.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
@@ -70,6 +89,12 @@ DATABASES = {
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
     }
 }
+# SQLite tuning profile, see posts/sqlite.py: 'default' or 'production'
+# (WAL, synchronous=NORMAL, mmap, busy timeout, persistent connections)
+SQLITE_PROFILE = os.environ.get('YATUBE_SQLITE_PROFILE', 'default')
+SQLITE_PRAGMAS = {}
+if SQLITE_PROFILE == 'production':
+    DATABASES['default']['CONN_MAX_AGE'] = 600
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
 AUTH_PASSWORD_VALIDATORS = [
@@ -105,8 +130,65 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 SITE_ID = 1
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# One SQLite file shared by every worker of this checkout, see
+# posts/cache_backend.py. It holds pickles, so it lives in the project
+# and is created readable by its owner only. yatube/test_settings.py
+# swaps it for a private in-memory cache.
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'posts.cache_backend.SQLiteCache',
+        'LOCATION': os.environ.get(
+            'YATUBE_CACHE_PATH',
+            os.path.join(BASE_DIR, 'var', 'cache.sqlite3'),
+        ),
+        'OPTIONS': {
+            'MAX_ENTRIES': 20000,
+            'MAX_BYTES': 128 * 2 ** 20,
+        },
     }
 }
+
+# Follow feed fan-out: authors above the limit are read on demand
+TIMELINE_FANOUT_LIMIT = 1000
+TIMELINE_BACKFILL_LIMIT = 200
+# Keyset pagination: ?page=N links are honoured up to this page
+LEGACY_PAGE_LIMIT = 5
+# Worker threads pre-rendering feed thumbnails; 0 renders inline
+THUMBNAIL_WORKERS = 2
+# Per-process metrics files of the server workers, summed by /metrics/;
+# clear the directory on deploy, the counters are cumulative
+METRICS_DIR = os.environ.get(
+    'YATUBE_METRICS_DIR',
+    os.path.join(BASE_DIR, 'var', 'metrics'),
+)
+METRICS_FLUSH_INTERVAL = 1.0
+# /metrics/ is served to staff users and to scrapers sending
+# "Authorization: Bearer <token>"; empty disables the token
+METRICS_TOKEN = os.environ.get('YATUBE_METRICS_TOKEN', '')
+# Queries slower than this are logged for the sampled share of requests
+SLOW_QUERY_THRESHOLD_MS = 100
+SLOW_QUERY_SAMPLE_RATE = float(
+    os.environ.get('YATUBE_SLOW_QUERY_SAMPLE_RATE', 0.01)
+)
+SLOW_QUERY_LOG = os.environ.get(
+    'YATUBE_SLOW_QUERY_LOG',
+    os.path.join(BASE_DIR, 'var', 'slow-queries.jsonl'),
+)
+# Size at which the slow-query log is rotated; one old file is kept
+SLOW_QUERY_LOG_MAX_BYTES = 10 * 2 ** 20
+# Template render times in response headers for every request; single
+# requests can opt in with a signed X-Template-Profile header instead
+TEMPLATE_PROFILING = False
+# Seconds one request may hold a page or fragment rebuild before others
+# stop waiting on it; the others are served the stale copy meanwhile
+CACHE_LOCK_TIMEOUT = 30
+# XFetch beta for probabilistic early refresh of cached pages and
+# fragments: 1 is the usual value, 0 only rebuilds on expiry
+CACHE_EARLY_REFRESH = float(os.environ.get('YATUBE_CACHE_EARLY_REFRESH', 0))
+# In-process LRU in front of the shared cache for groups, users and
+# flatpages (posts/tiered.py). Workers notice invalidations from other
+# workers within LOCAL_CACHE_CHECK_INTERVAL seconds
+LOCAL_CACHE_MAX_ENTRIES = 1024
+LOCAL_CACHE_MAX_BYTES = 4 * 2 ** 20
+LOCAL_CACHE_TTL = 300
+LOCAL_CACHE_CHECK_INTERVAL = 1.0
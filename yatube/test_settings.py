@@ -0,0 +1,29 @@
+"""Settings for the test suites.
+
+pytest loads these through pytest.ini and `manage.py test` by default.
+Test runs get a private in-memory cache: their database ids restart
+every run, and clearing the cache must not empty a running server's.
+Files they write go to a temporary directory removed on exit.
+"""
+import atexit
+import os
+import shutil
+import tempfile
+
+from .settings import *  # noqa: F401,F403
+
+
+scratch = tempfile.mkdtemp(prefix='yatube-tests-')
+atexit.register(shutil.rmtree, scratch, ignore_errors=True)
+
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'yatube-tests',
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    }
+}
+
+METRICS_DIR = os.path.join(scratch, 'metrics')
+SLOW_QUERY_LOG = os.path.join(scratch, 'slow-queries.jsonl')
@@ -17,7 +17,7 @@ from django.contrib import admin
 from django.urls import include, path
 from django.conf import settings
 from django.conf.urls.static import static
-from django.contrib.flatpages import views
+from posts import views
 from django.conf.urls import handler404, handler500
 
 
@@ -28,7 +28,8 @@ handler500 = 'posts.views.server_error' # noqa
 
 urlpatterns = [
         path('admin/', admin.site.urls),
-        path('about/', include('django.contrib.flatpages.urls')),
+        path('about/<path:url>', views.flatpage,
+             name='django.contrib.flatpages.views.flatpage'),
         path('auth/', include('users.urls')),
         path('auth/', include('django.contrib.auth.urls')),
         path('', include('posts.urls')),
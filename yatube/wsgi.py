@@ -9,8 +9,18 @@ https://docs.djangoproject.com/en/2.2/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+
+from posts import metrics  # noqa: E402
+
+metrics.serve()
+
+if settings.WARM_UP:
+    from posts import warmup
+
+    warmup.run()